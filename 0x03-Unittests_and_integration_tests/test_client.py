@@ -123,7 +123,7 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
         """Set up for the integration tests"""
 
         def side_effect(url):
-            """Side effect function for mocking requests.get from utils.py
+            """Side effect function for mocking the session get in utils.py
                 Returns a Mock object with a .json() method that returns
                 the appropriate payload based on the URL
             """
@@ -145,9 +145,13 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
 
             raise ValueError(f"Wrong URL called: {url}")
 
-        # Patch requests.get for all tests in this class
-        self.get_patcher = patch("requests.get")
-        mock_get = self.get_patcher.start()
+        # Requests must reach the mock unconditionally, not revalidate
+        self.cache_patcher = patch("utils._http_cache", None)
+        self.cache_patcher.start()
+
+        # Patch the pooled session's get for all tests in this class
+        self.get_patcher = patch("utils.get_session")
+        mock_get = self.get_patcher.start().return_value.get
         mock_get.side_effect = side_effect
 
     def test_public_repos(self):
@@ -167,6 +171,7 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
     def tearDownClass(self):
         """Tear down for the integration tests"""
         self.get_patcher.stop()
+        self.cache_patcher.stop()
 
 
 if __name__ == "__main__":
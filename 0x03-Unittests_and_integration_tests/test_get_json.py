@@ -16,11 +16,12 @@ class TestGetJson(unittest.TestCase):
         ("http://example.com", {"payload": True}),
         ("http://holberton.io", {"payload": False}),
     ])
-    @patch("utils.requests.get")
-    def test_get_json(self, url, payload, mock_get):
-        """Test JSON retrieval with mocked requests.get."""
+    @patch("utils.get_session")
+    def test_get_json(self, url, payload, mock_get_session):
+        """Test JSON retrieval with a mocked pooled session."""
         mock_response = Mock()
         mock_response.json.return_value = payload
+        mock_get = mock_get_session.return_value.get
         mock_get.return_value = mock_response
 
         result = get_json(url)
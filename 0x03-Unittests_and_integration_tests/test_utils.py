@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 """Unit tests for utils.py, covering access_nested_map,
-get_json, and memoize.
+get_json, get_json_many, and memoize.
 """
 
+import os
+import json
+import time
+import tempfile
+import threading
 import unittest
+import requests
 from typing import Any, Dict, Tuple
 from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from parameterized import parameterized
-from utils import access_nested_map, get_json, memoize
+import utils
+from utils import access_nested_map, get_json, get_json_many, memoize
 
 
 class TestAccessNestedMap(unittest.TestCase):
@@ -46,24 +54,303 @@ class TestAccessNestedMap(unittest.TestCase):
 class TestGetJson(unittest.TestCase):
     """Unit tests for the get_json function with mocked HTTP calls."""
 
+    def setUp(self) -> None:
+        """Keep any configured HTTP cache out of the mocked calls."""
+        cache = utils._http_cache
+        utils.configure_http_cache(None)
+        self.addCleanup(setattr, utils, "_http_cache", cache)
+
     @parameterized.expand([
         ("http://example.com", {"payload": True}),
         ("http://holberton.io", {"payload": False}),
     ])
-    @patch('utils.requests.get')
+    @patch('utils.get_session')
     def test_get_json(
         self,
         test_url: str,
         test_payload: Dict[str, Any],
-        mock_get: patch
+        mock_get_session: patch
     ) -> None:
         """Test get_json returns expected payload and calls get once."""
+        mock_get = mock_get_session.return_value.get
         mock_get.return_value.json.return_value = test_payload
         result = get_json(test_url)
         self.assertEqual(result, test_payload)
         mock_get.assert_called_once_with(test_url)
 
 
+class JSONHandler(BaseHTTPRequestHandler):
+    """Base handler for the local stub servers: keep-alive, quiet, and
+    with a helper to send a JSON (or empty) response.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep connections alive
+    # headers and body go out as separate writes
+    disable_nagle_algorithm = True
+
+    def send_json(self, status: int, payload: Any = None,
+                  headers: Dict[str, str] = None) -> None:
+        """Send status with payload as JSON (no body if None)."""
+        body = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        """Keep test output quiet."""
+
+
+class StubServerTestCase(unittest.TestCase):
+    """Runs `handler` on a free local port for the test class's
+    lifetime; tests reach it at self.base_url.
+    """
+
+    handler = JSONHandler
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Start the stub server on a free port."""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), cls.handler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever,
+                         daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Stop the stub server."""
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+class StubHandler(JSONHandler):
+    """Answers GET /<path> with {"path": "/<path>"}, or 404 for /missing.
+
+    Counts TCP connections and the most requests handled at once.
+    """
+
+    def setup(self) -> None:
+        """Count each new connection."""
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self) -> None:
+        """Serve the JSON payload after the server's delay."""
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight,
+                                       server.in_flight)
+        try:
+            time.sleep(server.delay)
+            if self.path == "/missing":
+                self.send_json(404, {})
+            else:
+                self.send_json(200, {"path": self.path})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+class TestGetJsonStubServer(StubServerTestCase):
+    """Tests for the pooled get_json and get_json_many against a
+    local stub HTTP server.
+    """
+
+    handler = StubHandler
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Stop the stub server and drop the shared session."""
+        super().tearDownClass()
+        utils.configure_session()
+
+    def setUp(self) -> None:
+        """Start each test with a fresh session and counters."""
+        utils.configure_session()
+        self.server.connections = 0
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.delay = 0
+
+    def test_get_json(self) -> None:
+        """Test get_json returns the server's JSON payload."""
+        self.assertEqual(get_json(f"{self.base_url}/orgs/google"),
+                         {"path": "/orgs/google"})
+
+    def test_get_json_reuses_connection(self) -> None:
+        """Test sequential calls share one kept-alive connection."""
+        for i in range(20):
+            get_json(f"{self.base_url}/{i}")
+        self.assertEqual(self.server.connections, 1)
+
+    def test_get_json_http_error(self) -> None:
+        """Test get_json raises for an error status."""
+        with self.assertRaises(requests.HTTPError):
+            get_json(f"{self.base_url}/missing")
+
+    def test_get_json_many_keeps_order(self) -> None:
+        """Test get_json_many returns payloads in the order of urls."""
+        urls = [f"{self.base_url}/{i}" for i in range(20)]
+        self.assertEqual(get_json_many(urls),
+                         [{"path": f"/{i}"} for i in range(20)])
+
+    def test_get_json_many_bounded(self) -> None:
+        """Test get_json_many runs requests concurrently, capped at
+        max_workers, and reuses the pooled connections.
+        """
+        self.server.delay = 0.05
+        urls = [f"{self.base_url}/{i}" for i in range(12)]
+        get_json_many(urls, max_workers=3)
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(self.server.max_in_flight, 3)
+        self.assertLessEqual(self.server.connections, 3)
+
+    def test_get_json_many_error(self) -> None:
+        """Test get_json_many raises when one of the URLs fails."""
+        urls = [f"{self.base_url}/a", f"{self.base_url}/missing"]
+        with self.assertRaises(requests.HTTPError):
+            get_json_many(urls)
+
+    def test_get_json_many_empty(self) -> None:
+        """Test get_json_many with no URLs makes no requests."""
+        self.assertEqual(get_json_many([]), [])
+        self.assertEqual(self.server.connections, 0)
+
+
+class ConditionalHandler(JSONHandler):
+    """Serves /etag/<name> with an ETag and /modified/<name> with a
+    Last-Modified header, answering 304 when the client's validator
+    still matches the server's current version. /plain/<name> has no
+    validators. Counts full (200) and not-modified (304) responses.
+    """
+
+    LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:{:02d} GMT"
+
+    def do_GET(self) -> None:
+        """Serve the payload, or 304 if the client's copy is current."""
+        server = self.server
+        version = server.version
+        etag = f'"v{version}"'
+        last_modified = self.LAST_MODIFIED.format(version)
+        headers = {}
+        if self.path.startswith("/etag/"):
+            headers["ETag"] = etag
+            fresh = self.headers.get("If-None-Match") == etag
+        elif self.path.startswith("/modified/"):
+            headers["Last-Modified"] = last_modified
+            fresh = self.headers.get("If-Modified-Since") == last_modified
+        else:
+            fresh = False
+
+        if fresh:
+            server.not_modified += 1
+            self.send_json(304, headers=headers)
+        else:
+            server.full += 1
+            self.send_json(200, {"path": self.path, "version": version},
+                           headers)
+
+
+class TestHTTPCache(StubServerTestCase):
+    """Tests for get_json's ETag/Last-Modified cache against a local
+    server that answers 304 Not Modified.
+    """
+
+    handler = ConditionalHandler
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Stop the server and restore the default cache."""
+        super().tearDownClass()
+        utils.configure_http_cache(utils.HTTP_CACHE_DIR)
+
+    def assertCounts(self, expected: Tuple[int, int]) -> None:
+        """Assert the server's (200 responses, 304 responses) counts."""
+        self.assertEqual((self.server.full, self.server.not_modified),
+                         expected)
+
+    def setUp(self) -> None:
+        """Use an empty cache directory and reset the server."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        utils.configure_http_cache(self.tmp.name)
+        self.server.version = 1
+        self.server.full = 0
+        self.server.not_modified = 0
+
+    @parameterized.expand([("etag",), ("modified",)])
+    def test_revalidates(self, kind: str) -> None:
+        """Test the second fetch is a 304 returning the cached payload."""
+        url = f"{self.base_url}/{kind}/google"
+        first = get_json(url)
+        second = get_json(url)
+        self.assertEqual(first, {"path": f"/{kind}/google", "version": 1})
+        self.assertEqual(second, first)
+        self.assertCounts((1, 1))
+
+    def test_not_modified_skips_parsing(self) -> None:
+        """Test a 304 reuses the parsed payload instead of parsing again."""
+        url = f"{self.base_url}/etag/google"
+        first = get_json(url)
+        with patch("utils.json.loads") as mock_loads:
+            self.assertIs(get_json(url), first)
+        mock_loads.assert_not_called()
+
+    def test_persists_across_caches(self) -> None:
+        """Test a fresh cache on the same directory (as in a new process)
+        revalidates from disk.
+        """
+        url = f"{self.base_url}/etag/google"
+        expected = get_json(url)
+        utils.configure_http_cache(self.tmp.name)
+        self.assertEqual(get_json(url), expected)
+        self.assertCounts((1, 1))
+
+    def test_changed_resource_refetched(self) -> None:
+        """Test a changed resource is downloaded and cached again."""
+        url = f"{self.base_url}/etag/google"
+        get_json(url)
+        self.server.version = 2
+        self.assertEqual(get_json(url)["version"], 2)
+        self.assertEqual(get_json(url)["version"], 2)
+        self.assertCounts((2, 1))
+
+    def test_no_validators_not_cached(self) -> None:
+        """Test responses without ETag/Last-Modified are not stored."""
+        url = f"{self.base_url}/plain/google"
+        get_json(url)
+        get_json(url)
+        self.assertCounts((2, 0))
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_lost_body_refetched(self) -> None:
+        """Test a 304 for an entry whose body file is gone refetches it."""
+        url = f"{self.base_url}/etag/google"
+        expected = get_json(url)
+        for name in os.listdir(self.tmp.name):
+            if name.endswith(".body"):
+                os.remove(os.path.join(self.tmp.name, name))
+        utils.configure_http_cache(self.tmp.name)
+        self.assertEqual(get_json(url), expected)
+        self.assertCounts((2, 1))
+
+    def test_cache_disabled(self) -> None:
+        """Test configure_http_cache(None) turns revalidation off."""
+        utils.configure_http_cache(None)
+        url = f"{self.base_url}/etag/google"
+        get_json(url)
+        get_json(url)
+        self.assertCounts((2, 0))
+
+
 class TestMemoize(unittest.TestCase):
     """Unit tests for the memoize decorator."""
 
@@ -1,17 +1,228 @@
 #!/usr/bin/env python3
 """Utils functions for GithubOrgClient."""
 
+import os
+import json
+import hashlib
+import tempfile
+import threading
 import requests
-from typing import Any, Dict, Tuple, Callable
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple, Callable, Iterable, Optional
+
+# Defaults for the shared session: hosts kept in the pool, keep-alive
+# connections kept per host, and get_json_many's worker threads.
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+MAX_WORKERS = 8
+
+# Directory for get_json's revalidating response cache. The cache is
+# opt-in: set HTTP_CACHE_DIR or call configure_http_cache(directory).
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR")
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _new_session(pool_connections: int,
+                 pool_maxsize: int) -> requests.Session:
+    """Build a session whose adapters keep the given pool sizes."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def configure_session(
+    pool_connections: int = POOL_CONNECTIONS,
+    pool_maxsize: int = POOL_MAXSIZE,
+) -> requests.Session:
+    """Replace the shared session with one using the given pool sizes.
+
+    Args:
+        pool_connections (int): number of hosts to keep pools for.
+        pool_maxsize (int): keep-alive connections kept per host; should be
+            at least the parallelism used with get_json_many.
+
+    Returns:
+        requests.Session: the new shared session.
+    """
+    global _session
+    session = _new_session(pool_connections, pool_maxsize)
+    with _session_lock:
+        old, _session = _session, session
+    if old is not None:
+        old.close()
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the shared keep-alive session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _new_session(POOL_CONNECTIONS, POOL_MAXSIZE)
+        return _session
+
+
+class HTTPCache:
+    """Persistent on-disk cache of JSON responses with validators.
+
+    Responses carrying an ETag or Last-Modified header are stored as the
+    raw body plus a small metadata file, so later requests, including
+    from new client instances and new processes, can revalidate with
+    If-None-Match / If-Modified-Since. On a 304 the cached payload is
+    returned without downloading the body again; payloads already parsed
+    in this process are reused as is and should be treated as read-only.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """Keep cache files in directory, creating it when needed."""
+        self.directory = directory
+        self._parsed: Dict[str, Tuple[Dict, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, url: str, suffix: str) -> str:
+        """File for url's body or metadata."""
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + suffix)
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Return the stored validators for url, or None if not cached."""
+        with self._lock:
+            hit = self._parsed.get(url)
+        if hit is not None:
+            return hit[0]
+        try:
+            with open(self._path(url, ".meta")) as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def conditional_headers(meta: Dict) -> Dict[str, str]:
+        """Request headers that revalidate a cached entry."""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def payload(self, url: str, meta: Dict) -> Any:
+        """Return the cached payload for url; the body is parsed once."""
+        with self._lock:
+            hit = self._parsed.get(url)
+        if hit is not None and hit[0] == meta:
+            return hit[1]
+        with open(self._path(url, ".body"), "rb") as body_file:
+            payload = json.loads(body_file.read())
+        with self._lock:
+            self._parsed[url] = (meta, payload)
+        return payload
+
+    def store(self, url: str, response: requests.Response) -> Any:
+        """Cache a 200 response if it has validators; return its payload."""
+        payload = response.json()
+        meta = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        if not (meta["etag"] or meta["last_modified"]):
+            return payload
+        os.makedirs(self.directory, exist_ok=True)
+        # Body first, then metadata, each replaced atomically
+        self._write(self._path(url, ".body"), response.content)
+        self._write(self._path(url, ".meta"),
+                    json.dumps(meta).encode("utf-8"))
+        with self._lock:
+            self._parsed[url] = (meta, payload)
+        return payload
+
+    def _write(self, path: str, data: bytes) -> None:
+        """Write data to path atomically."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._parsed.clear()
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith((".body", ".meta")):
+                    os.remove(os.path.join(self.directory, name))
+
+
+_http_cache: Optional[HTTPCache] = (
+    HTTPCache(HTTP_CACHE_DIR) if HTTP_CACHE_DIR else None)
+
+
+def configure_http_cache(directory: Optional[str]) -> Optional[HTTPCache]:
+    """Enable get_json's response cache in directory; None disables it."""
+    global _http_cache
+    _http_cache = HTTPCache(directory) if directory else None
+    return _http_cache
 
 
 def get_json(url: str) -> Dict:
-    """Make an HTTP GET request to the URL and return the JSON response."""
-    response = requests.get(url)
+    """Make an HTTP GET request to the URL and return the JSON response.
+
+    Uses the shared pooled session, so repeated calls to the same host
+    reuse a kept-alive connection instead of a new TCP/TLS handshake.
+    With the HTTP cache enabled, responses with an ETag or Last-Modified
+    are kept and revalidated; a 304 returns the cached payload.
+    """
+    cache = _http_cache
+    meta = cache.lookup(url) if cache else None
+    if meta:
+        response = get_session().get(
+            url, headers=cache.conditional_headers(meta))
+        if response.status_code == 304:
+            try:
+                return cache.payload(url, meta)
+            except (OSError, ValueError):
+                # Body file lost or corrupt: fetch it again in full
+                response = get_session().get(url)
+    else:
+        response = get_session().get(url)
     response.raise_for_status()
+    if cache and response.status_code == 200:
+        return cache.store(url, response)
     return response.json()
 
 
+def get_json_many(urls: Iterable[str],
+                  max_workers: int = MAX_WORKERS) -> List[Dict]:
+    """Fetch several URLs concurrently with get_json.
+
+    Args:
+        urls (iterable): URLs to fetch.
+        max_workers (int): most requests in flight at once.
+
+    Returns:
+        list: the JSON payloads, in the same order as urls.
+
+    Raises:
+        requests.HTTPError: from the first URL (in order) that failed.
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+    workers = min(max_workers, len(urls))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(get_json, urls))
+
+
 def access_nested_map(data: Dict, path: Tuple) -> Any:
     """Access nested map items via sequence of keys called path.
 
@@ -1,47 +1,104 @@
+import time
 import sqlite3
 
+db_connections = __import__('db_connections')
+
 
 class DatabaseConnection:
     """Custom class-based context manager for database connections with parameterized query support."""
 
-    def __init__(self, db_name="users.db"):
+    # Status output when no hooks are passed; see db_connections.ConsoleHooks
+    default_hooks = db_connections.ConsoleHooks()
+
+    def __init__(self, db_name="users.db", profile=None, hooks=None):
+        """
+        profile names a PRAGMA set from db_connections.PROFILES, e.g. "read_heavy".
+        hooks gets the calls listed on db_connections.ConsoleHooks, e.g. a
+        db_connections.MetricsCollector; pass [ConsoleHooks(), metrics] for both.
+        """
         self.db_name = db_name
+        self.profile = profile
+        self.hooks = hooks if hooks is not None else self.default_hooks
         self.conn = None
         self.cursor = None
+        self.started = None
 
     def __enter__(self):
         """Open the database connection and return the cursor."""
-        self.conn = sqlite3.connect(self.db_name)
+        self.conn = self._open()
         self.cursor = self.conn.cursor()
-        print(f"✅ Connected to database: {self.db_name}")
+        self.started = time.perf_counter()
+        db_connections.call_hook(self.hooks, "on_connect", self.db_name)
         return self
 
+    def _open(self):
+        return db_connections.connect(self.db_name, self.profile)
+
+    def _close(self):
+        self.conn.close()
+
     def execute_query(self, query, params=None):
         """
         Execute a SQL query safely using parameterized inputs.
         Example:
             db.execute_query("SELECT * FROM users WHERE age > ?", (25,))
         """
+        db_connections.call_hook(self.hooks, "on_query_start", query, params)
+        started = time.perf_counter()
         try:
             if params:
                 self.cursor.execute(query, params)
             else:
                 self.cursor.execute(query)
-            return self.cursor.fetchall()
+            rows = self.cursor.fetchall()
         except sqlite3.Error as e:
-            print(f"⚠️ Database error: {e}")
+            db_connections.call_hook(
+                self.hooks, "on_query_end", query, params, time.perf_counter() - started, 0, e)
+            db_connections.call_hook(self.hooks, "on_error", e)
             return []
+        db_connections.call_hook(
+            self.hooks, "on_query_end", query, params, time.perf_counter() - started, len(rows), None)
+        return rows
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Close connection safely with commit/rollback handling."""
-        if exc_type:
-            self.conn.rollback()
-            print(f"❌ Error occurred: {exc_val}. Transaction rolled back.")
-        else:
-            self.conn.commit()
-            print("💾 Transaction committed successfully.")
-        self.conn.close()
-        print(f"🔒 Connection to {self.db_name} closed.")
+        try:
+            if exc_type:
+                self.conn.rollback()
+                db_connections.call_hook(self.hooks, "on_rollback", self.db_name, exc_val,
+                                         time.perf_counter() - self.started)
+            else:
+                self.conn.commit()
+                db_connections.call_hook(self.hooks, "on_commit", self.db_name,
+                                         time.perf_counter() - self.started)
+        finally:
+            self.cursor.close()
+            self._close()
+            self.conn = self.cursor = None
+        db_connections.call_hook(self.hooks, "on_close", self.db_name)
+
+
+class PooledDatabaseConnection(DatabaseConnection):
+    """
+    DatabaseConnection that borrows a warm connection from a shared
+    db_connections pool and returns it on exit instead of closing it.
+    Prints nothing unless hooks are given, so tight loops of small with
+    blocks pay neither connection setup nor terminal I/O.
+        with PooledDatabaseConnection("users.db", profile="read_heavy") as db:
+            db.execute_query("SELECT * FROM users WHERE id = ?", (1,))
+    """
+
+    default_hooks = None
+
+    def __init__(self, db_name="users.db", profile=None, hooks=None, pool_size=5):
+        super().__init__(db_name, profile, hooks)
+        self.pool = db_connections.get_pool(db_name, profile, pool_size)
+
+    def _open(self):
+        return self.pool.acquire()
+
+    def _close(self):
+        self.pool.release(self.conn)
 
 
 if __name__ == "__main__":
@@ -1,41 +1,180 @@
+import time
 import sqlite3
+from itertools import islice
+
+db_connections = __import__('db_connections')
+
+# Writes made here invalidate the dependent cache_query entries; importing
+# db_connections puts python-decorators-0x01 on the path for this.
+query_cache = __import__('4-cache_query')
+
+
+class _ConsoleHooks(db_connections.ConsoleHooks):
+    """ExecuteQuery's status lines."""
+
+    def on_connect(self, db_name):
+        pass
+
+    def on_commit(self, db_name, duration):
+        pass
+
+    def on_rollback(self, db_name, error, duration):
+        print(f"❌ Error occurred: {error}. Rolled back transaction.")
+
+    def on_close(self, db_name):
+        print("🔒 Database connection closed.")
+
 
 class ExecuteQuery:
-    """Reusable context manager to execute a database query safely."""
+    """
+    Reusable context manager to execute a database query safely.
+    By default the with block gets the fetched rows as a list. Two modes
+    keep large reads and bulk writes memory-flat:
+    stream=True gives a lazy row iterator, fetching chunk_size rows at a
+        time; it is valid only inside the with block.
+            with ExecuteQuery("users.db", "SELECT * FROM users", stream=True) as rows:
+                for row in rows: ...
+    many=True treats params as an iterable of parameter tuples and runs
+        executemany over chunk_size of them at a time, committing after each
+        chunk; the with block gets the number of rows written. A failure
+        rolls back only the current chunk.
+            with ExecuteQuery("users.db", "INSERT INTO users (name) VALUES (?)",
+                              ((name,) for name in names), many=True) as count: ...
+    """
+
+    # Status output when no hooks are passed
+    default_hooks = _ConsoleHooks()
 
-    def __init__(self, db_name="users.db", query=None, params=None):
+    def __init__(self, db_name="users.db", query=None, params=None, profile=None,
+                 stream=False, many=False, chunk_size=1000, hooks=None):
+        """
+        profile names a PRAGMA set from db_connections.PROFILES, e.g. "read_heavy".
+        hooks gets the calls listed on db_connections.ConsoleHooks, e.g. a
+        db_connections.MetricsCollector. A stream's on_query_end fires when
+        the with block exits; many fires query and commit hooks per chunk.
+        """
+        if stream and many:
+            raise ValueError("stream and many cannot be combined")
         self.db_name = db_name
+        self.profile = profile
         self.query = query
         self.params = params
+        self.stream = stream
+        self.many = many
+        self.chunk_size = chunk_size
         self.conn = None
         self.cursor = None
+        self.hooks = hooks if hooks is not None else self.default_hooks
         self.results = None
+        self.written_tables = set()
+        self.started = None
+        self._query_started = None
+        self._streamed = None
 
     def __enter__(self):
         """Open database connection and execute the provided query."""
-        self.conn = sqlite3.connect(self.db_name)
+        self.conn = db_connections.connect(self.db_name, self.profile)
         self.cursor = self.conn.cursor()
+        self.started = time.perf_counter()
+        db_connections.call_hook(self.hooks, "on_connect", self.db_name)
 
+        try:
+            with query_cache.track_tables(self.conn, query_cache.WRITE_ACTIONS) as written:
+                self.written_tables = written
+                self._run()
+        except sqlite3.Error as e:
+            db_connections.call_hook(self.hooks, "on_error", e)
+            if not self.many:
+                self.results = []  # many keeps the count of rows committed so far
+        return self.results
+
+    def _run(self):
+        """Execute the query and materialize its rows (or set up streaming)."""
+        if self.many:
+            self._run_many()
+            return
+        self._start_query()
         try:
             if self.params:
                 self.cursor.execute(self.query, self.params)
             else:
                 self.cursor.execute(self.query)
-            self.results = self.cursor.fetchall()
+            if self.stream:
+                self._streamed = 0
+                self.results = self._iter_rows()
+            else:
+                self.results = self.cursor.fetchall()
+                self._end_query(len(self.results))
         except sqlite3.Error as e:
-            print(f"⚠️ Database error: {e}")
-            self.results = []
-        return self.results
+            self._end_query(0, e)
+            raise
+
+    def _start_query(self, params=None):
+        self._query_started = time.perf_counter()
+        db_connections.call_hook(self.hooks, "on_query_start", self.query, params or self.params)
+
+    def _end_query(self, rows, error=None, params=None):
+        db_connections.call_hook(
+            self.hooks, "on_query_end", self.query, params or self.params,
+            time.perf_counter() - self._query_started, rows, error)
+
+    def _iter_rows(self):
+        """Yield rows chunk_size at a time while the context is open."""
+        while True:
+            if self.conn is None:
+                raise sqlite3.ProgrammingError("ExecuteQuery rows read after the with block exited")
+            rows = self.cursor.fetchmany(self.chunk_size)
+            if not rows:
+                return
+            self._streamed += len(rows)
+            yield from rows
+
+    def _run_many(self):
+        """executemany over params in chunks, committing after each chunk."""
+        self.results = 0
+        params = iter(self.params or ())
+        while True:
+            chunk = list(islice(params, self.chunk_size))
+            if not chunk:
+                return
+            self._start_query(chunk)
+            try:
+                self.cursor.executemany(self.query, chunk)
+                self.conn.commit()
+            except sqlite3.Error as e:
+                # Drop the rows executemany wrote before failing, so the
+                # count returned matches what was committed
+                self.conn.rollback()
+                self._end_query(0, e, chunk)
+                db_connections.call_hook(self.hooks, "on_rollback", self.db_name, e,
+                                         time.perf_counter() - self.started)
+                raise
+            self._end_query(self.cursor.rowcount, params=chunk)
+            db_connections.call_hook(self.hooks, "on_commit", self.db_name,
+                                     time.perf_counter() - self.started)
+            self.started = time.perf_counter()
+            self.results += self.cursor.rowcount
+            # Readers may see each committed chunk, so invalidate per chunk
+            query_cache.invalidate_tables(self.written_tables)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Commit changes if no exception, rollback otherwise, and close connection."""
+        if self._streamed is not None:
+            error = exc_val if isinstance(exc_val, sqlite3.Error) else None
+            self._end_query(self._streamed, error)
+            self._streamed = None
         if exc_type:
             self.conn.rollback()
-            print(f"❌ Error occurred: {exc_val}. Rolled back transaction.")
+            db_connections.call_hook(self.hooks, "on_rollback", self.db_name, exc_val,
+                                     time.perf_counter() - self.started)
         else:
             self.conn.commit()
+            db_connections.call_hook(self.hooks, "on_commit", self.db_name,
+                                     time.perf_counter() - self.started)
+            query_cache.invalidate_tables(self.written_tables)
         self.conn.close()
-        print("🔒 Database connection closed.")
+        self.conn = None
+        db_connections.call_hook(self.hooks, "on_close", self.db_name)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,94 @@
+import sys
+import json
+import time
 import aiosqlite
 import asyncio
 
+db_connections = __import__('db_connections')
+dataloader = __import__('dataloader')
+
 DB_NAME = "users.db"
+# Connections (and aiosqlite worker threads) shared by every fetch_query
+POOL_SIZE = 8
+
+
+async def fetch_query(query, params=None, timeout=None):
+    """
+    Reusable async function to execute a query and fetch results.
+    Borrows one of POOL_SIZE pooled connections, so any number of
+    concurrent calls share a fixed set of connections and threads.
+    If the query runs past `timeout` seconds (TimeoutError) or the awaiting
+    task is cancelled, the running SQLite statement is interrupted rather
+    than left to finish on the connection's thread.
+    """
+    pool = await db_connections.get_async_pool(DB_NAME, size=POOL_SIZE)
+    async with pool.connection() as conn:
+        return await _fetch_interruptible(conn, query, params, timeout)
+
+
+async def _fetchall(conn, query, params):
+    async with conn.execute(query, params or ()) as cursor:
+        return await cursor.fetchall()
+
+
+async def _fetch_interruptible(conn, query, params, timeout):
+    fetch = asyncio.ensure_future(_fetchall(conn, query, params))
+    try:
+        return await asyncio.wait_for(asyncio.shield(fetch), timeout)
+    except BaseException:
+        # interrupt() is a no-op if the statement has not started yet, so
+        # repeat it until SQLite gives the connection back
+        while not fetch.done():
+            await conn.interrupt()
+            await asyncio.wait([fetch], timeout=0.05)
+        if not fetch.cancelled():
+            fetch.exception()  # mark the "interrupted" error as retrieved
+        raise
+
+
+async def gather_queries(*queries, timeout=None):
+    """
+    Run (query, params) pairs concurrently, each with its own timeout.
+    Unlike asyncio.gather, one slow or failing query does not cost the
+    others their results: returns (results, errors) where results[i] is
+    None for a failed query and errors maps its index to the exception.
+        results, errors = await gather_queries(
+            ("SELECT * FROM users", None),
+            ("SELECT * FROM users WHERE age > ?", (40,)),
+            timeout=2)
+    """
+    outcomes = await asyncio.gather(
+        *(fetch_query(query, params, timeout) for query, params in queries),
+        return_exceptions=True)
+    errors = {index: outcome for index, outcome in enumerate(outcomes)
+              if isinstance(outcome, BaseException)}
+    results = [None if index in errors else outcome for index, outcome in enumerate(outcomes)]
+    return results, errors
 
 
-async def fetch_query(query, params=None):
-    """Reusable async function to execute a query and fetch results."""
+async def fetch_query_unpooled(query, params=None):
+    """fetch_query() with a new connection per call; kept for benchmark()."""
     async with aiosqlite.connect(DB_NAME) as conn:
         async with conn.execute(query, params or ()) as cursor:
-            results = await cursor.fetchall()
-            return results
+            return await cursor.fetchall()
+
+
+async def fetch_users_by_ids(ids):
+    """Batch function for user_loader(): one IN query for all ids, in order."""
+    placeholders = ", ".join("?" * len(ids))
+    rows = await fetch_query(f"SELECT * FROM users WHERE id IN ({placeholders})", tuple(ids))
+    by_id = {row[0]: row for row in rows}
+    return [by_id.get(user_id) for user_id in ids]
+
+
+def user_loader(max_batch_size=100):
+    """
+    New DataLoader for users by id; create one per request. Lookups made
+    in the same tick are fetched with a single query.
+        loader = user_loader()
+        users = await asyncio.gather(*(loader.load(i) for i in ids))
+    """
+    return dataloader.DataLoader(fetch_users_by_ids, max_batch_size=max_batch_size)
 
 
 async def async_fetch_users():
@@ -38,5 +117,34 @@ async def fetch_concurrently():
     )
 
 
+async def _throughput(fetch, concurrency, total):
+    """Queries per second running `total` point lookups, `concurrency` at a time."""
+    started = time.perf_counter()
+    for offset in range(0, total, concurrency):
+        await asyncio.gather(*(
+            fetch("SELECT * FROM users WHERE id = ?", (i % 100 + 1,))
+            for i in range(offset, min(offset + concurrency, total))
+        ))
+    return total / (time.perf_counter() - started)
+
+
+async def benchmark(levels=(1, 10, 100, 1000), total=2000):
+    """
+    Compare pooled and per-query connections at each concurrency level and
+    return queries/second for both.
+    """
+    results = []
+    for concurrency in levels:
+        results.append({
+            "concurrency": concurrency,
+            "pooled_qps": round(await _throughput(fetch_query, concurrency, total)),
+            "unpooled_qps": round(await _throughput(fetch_query_unpooled, concurrency, total)),
+        })
+    return results
+
+
 if __name__ == "__main__":
-    asyncio.run(fetch_concurrently())
+    if "--benchmark" in sys.argv:
+        print(json.dumps(asyncio.run(benchmark()), indent=2))
+    else:
+        asyncio.run(fetch_concurrently())
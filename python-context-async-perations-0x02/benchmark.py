@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import random
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+
+databaseconnection = __import__('0-databaseconnection')
+execute = __import__('1-execute')
+concurrent = __import__('3-concurrent')
+
+QUERY = "SELECT * FROM users WHERE id = ?"
+
+
+def seed(db_name, rows=10000):
+    """
+    Create a synthetic users table with `rows` rows in db_name.
+    Refuses (ValueError) a database that already has a users table, so a
+    mistyped --db cannot wipe real data.
+    """
+    conn = sqlite3.connect(db_name)
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'").fetchone()
+        if exists:
+            raise ValueError(f"{db_name} already has a users table; pass a new file to --db")
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)")
+        rng = random.Random(42)
+        conn.executemany(
+            "INSERT INTO users (id, name, email, age) VALUES (?, ?, ?, ?)",
+            ((i, f"user{i}", f"user{i}@example.com", rng.randint(18, 90)) for i in range(1, rows + 1)))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def summarize(name, latencies, elapsed, concurrency=1):
+    """Throughput and latency percentiles (ms) for one run."""
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 3)
+
+    return {
+        "method": name,
+        "concurrency": concurrency,
+        "queries": len(latencies),
+        "qps": round(len(latencies) / elapsed),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+
+
+def run_sequential(name, run_one, ids):
+    latencies = []
+    started = time.perf_counter()
+    for user_id in ids:
+        t = time.perf_counter()
+        run_one(user_id)
+        latencies.append(time.perf_counter() - t)
+    return summarize(name, latencies, time.perf_counter() - started)
+
+
+async def run_concurrent(name, fetch, ids, concurrency):
+    """`concurrency` workers issue the lookups until ids run out."""
+    pending = iter(ids)
+    latencies = []
+
+    async def worker():
+        for user_id in pending:
+            t = time.perf_counter()
+            await fetch(QUERY, (user_id,))
+            latencies.append(time.perf_counter() - t)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, time.perf_counter() - started, concurrency)
+
+
+async def run_async(ids, levels):
+    results = []
+    for concurrency in levels:
+        results.append(await run_concurrent(
+            "gather_per_query_connection", concurrent.fetch_query_unpooled, ids, concurrency))
+        results.append(await run_concurrent(
+            "gather_pooled", concurrent.fetch_query, ids, concurrency))
+    return results
+
+
+def run(db_name, queries=2000, levels=(1, 10, 100), rows=10000):
+    """Run every method against db_name and return the report."""
+    rng = random.Random(7)
+    ids = [rng.randint(1, rows) for _ in range(queries)]
+    silent = object()  # a hooks object with no hooks
+    results = []
+
+    def with_database_connection(user_id):
+        with databaseconnection.DatabaseConnection(db_name, hooks=silent) as db:
+            db.execute_query(QUERY, (user_id,))
+
+    def with_execute_query(user_id):
+        with execute.ExecuteQuery(db_name, QUERY, (user_id,), hooks=silent):
+            pass
+
+    def with_pooled_connection(user_id):
+        with databaseconnection.PooledDatabaseConnection(db_name) as db:
+            db.execute_query(QUERY, (user_id,))
+
+    results.append(run_sequential("sequential_DatabaseConnection", with_database_connection, ids))
+    results.append(run_sequential("sequential_ExecuteQuery", with_execute_query, ids))
+    results.append(run_sequential("sequential_PooledDatabaseConnection", with_pooled_connection, ids))
+
+    concurrent.DB_NAME = db_name
+    results.extend(asyncio.run(run_async(ids, levels)))
+    return {"rows": rows, "queries": queries, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the context managers and async helpers.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--levels", default="1,10,100",
+                        help="comma-separated concurrency levels for the async runs")
+    parser.add_argument("--db", help="new database file to seed (default: a temporary file)")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(",")]
+
+    with tempfile.TemporaryDirectory() as scratch:
+        db_name = args.db or os.path.join(scratch, "users.db")
+        try:
+            seed(db_name, args.rows)
+        except ValueError as e:
+            parser.error(str(e))
+        print(json.dumps(run(db_name, args.queries, levels, args.rows), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import asyncio
+
+
+class DataLoader:
+    """
+    Batches point lookups made in the same event-loop tick.
+    load(key) queues the key and returns a future; once the current tick's
+    callbacks have run, the queued keys go to batch_fn in one call (split
+    into max_batch_size chunks) and each future gets its own value.
+    batch_fn is a coroutine function taking a list of distinct keys and
+    returning a list of values in the same order; a value that is an
+    Exception is raised to that key's callers only.
+
+    Results are cached by key for the loader's lifetime, so create one
+    loader per request: it then doubles as a per-request cache and never
+    serves another request's stale rows.
+        loader = DataLoader(fetch_users_by_ids)
+        alice, bob = await asyncio.gather(loader.load(1), loader.load(2))
+    """
+
+    def __init__(self, batch_fn, max_batch_size=100, cache=True):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+        self.batches = 0
+        self._cache = {}
+        self._queue = []
+        self._scheduled = False
+        self._tasks = set()
+
+    def load(self, key):
+        """
+        Return an awaitable for the value of `key`. Each caller gets its own
+        shield around the shared future, so one caller's cancellation (a
+        wait_for timeout, say) does not cancel the load for the others.
+        """
+        future = self._cache.get(key) if self.cache else None
+        if future is None or future.cancelled():
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            if self.cache:
+                self._cache[key] = future
+            self._queue.append((key, future))
+            if not self._scheduled:
+                self._scheduled = True
+                loop.call_soon(self._dispatch)
+        return asyncio.shield(future)
+
+    async def load_many(self, keys):
+        """Load several keys at once; returns their values in order."""
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    def prime(self, key, value):
+        """Seed the cache with a value fetched some other way."""
+        if self.cache and key not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._cache[key] = future
+
+    def clear(self, key=None):
+        """Forget one cached key (or all of them), e.g. after writing it."""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+    def _dispatch(self):
+        queued, self._queue = self._queue, []
+        self._scheduled = False
+        for start in range(0, len(queued), self.max_batch_size):
+            task = asyncio.ensure_future(self._run_batch(queued[start:start + self.max_batch_size]))
+            self._tasks.add(task)  # keep a reference until it finishes
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch):
+        keys = list(dict.fromkeys(key for key, _ in batch))
+        self.batches += 1
+        try:
+            values = await self.batch_fn(keys)
+            if len(values) != len(keys):
+                raise ValueError(
+                    f"batch_fn returned {len(values)} values for {len(keys)} keys")
+        except BaseException as e:
+            for key, future in batch:
+                self._fail(key, future, e)
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        by_key = dict(zip(keys, values))
+        for key, future in batch:
+            value = by_key[key]
+            if isinstance(value, Exception):
+                self._fail(key, future, value)
+            elif not future.done():
+                future.set_result(value)
+
+    def _fail(self, key, future, error):
+        # Failed keys are not cached, so a later load() retries them
+        if self._cache.get(key) is future:
+            del self._cache[key]
+        if future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(error)
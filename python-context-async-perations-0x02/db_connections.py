@@ -0,0 +1,160 @@
+import os
+import sys
+import threading
+
+# Profiles and pools live in python-decorators-0x01/connection_pool.py, one
+# implementation for both packages; put that directory on the path
+# explicitly so the import fails loudly if it is missing.
+DECORATORS_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "python-decorators-0x01"))
+if DECORATORS_DIR not in sys.path:
+    sys.path.append(DECORATORS_DIR)
+
+connection_pool = __import__('connection_pool')
+DB_NAME = connection_pool.DB_NAME
+PROFILES = connection_pool.PROFILES
+profile_pragmas = connection_pool.profile_pragmas
+connect = connection_pool.connect
+ConnectionPool = connection_pool.ConnectionPool
+get_pool = connection_pool.get_pool
+AsyncConnectionPool = connection_pool.AsyncConnectionPool
+get_async_pool = connection_pool.get_async_pool
+close_async_pools = connection_pool.close_async_pools
+
+
+class ConsoleHooks:
+    """
+    Hooks that print the context managers' status lines to the console.
+    The full hook interface, all optional:
+        on_connect(db_name)
+        on_query_start(query, params)
+        on_query_end(query, params, elapsed, rows, error)
+        on_error(error)
+        on_commit(db_name, duration)
+        on_rollback(db_name, error, duration)
+        on_close(db_name)
+    elapsed and duration are in seconds; duration is how long the
+    transaction was open; error is None for a successful query.
+    """
+
+    def on_connect(self, db_name):
+        print(f"✅ Connected to database: {db_name}")
+
+    def on_error(self, error):
+        print(f"⚠️ Database error: {error}")
+
+    def on_commit(self, db_name, duration):
+        print("💾 Transaction committed successfully.")
+
+    def on_rollback(self, db_name, error, duration):
+        print(f"❌ Error occurred: {error}. Transaction rolled back.")
+
+    def on_close(self, db_name):
+        print(f"🔒 Connection to {db_name} closed.")
+
+
+class MetricsCollector:
+    """
+    Hooks that aggregate where database time goes: connections, per-query
+    calls, errors, rows and latency histograms, and commit/rollback counts
+    with a transaction-duration histogram. Thread-safe; pass one collector
+    to many context managers and read snapshot() whenever needed.
+        metrics = MetricsCollector()
+        with PooledDatabaseConnection("users.db", hooks=metrics) as db: ...
+        print(metrics.snapshot())
+    """
+
+    # Histogram bucket upper bounds in milliseconds; the last is open-ended
+    BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, float("inf"))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Discard everything collected so far."""
+        with self._lock:
+            self.connections = 0
+            self.commits = 0
+            self.rollbacks = 0
+            self._queries = {}
+            self._transactions = [0] * len(self.BUCKETS_MS)
+
+    def _bucket(self, seconds):
+        ms = seconds * 1000
+        for index, bound in enumerate(self.BUCKETS_MS):
+            if ms <= bound:
+                return index
+
+    def on_connect(self, db_name):
+        with self._lock:
+            self.connections += 1
+
+    def on_query_end(self, query, params, elapsed, rows, error):
+        with self._lock:
+            entry = self._queries.get(query)
+            if entry is None:
+                entry = self._queries[query] = {
+                    "calls": 0,
+                    "errors": 0,
+                    "rows": 0,
+                    "total_time": 0.0,
+                    "histogram": [0] * len(self.BUCKETS_MS),
+                }
+            entry["calls"] += 1
+            entry["errors"] += error is not None
+            entry["rows"] += rows or 0
+            entry["total_time"] += elapsed
+            entry["histogram"][self._bucket(elapsed)] += 1
+
+    def on_commit(self, db_name, duration):
+        with self._lock:
+            self.commits += 1
+            self._transactions[self._bucket(duration)] += 1
+
+    def on_rollback(self, db_name, error, duration):
+        with self._lock:
+            self.rollbacks += 1
+            self._transactions[self._bucket(duration)] += 1
+
+    def snapshot(self):
+        """Counters and histograms (bucket label -> count), most total time first."""
+        labels = [f"<={bound:g}ms" for bound in self.BUCKETS_MS[:-1]]
+        labels.append(f">{self.BUCKETS_MS[-2]:g}ms")
+        with self._lock:
+            queries = [
+                {
+                    "query": query,
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "rows": entry["rows"],
+                    "total_ms": round(entry["total_time"] * 1000, 3),
+                    "mean_ms": round(entry["total_time"] / entry["calls"] * 1000, 3),
+                    "histogram": dict(zip(labels, entry["histogram"])),
+                }
+                for query, entry in self._queries.items()
+            ]
+            report = {
+                "connections": self.connections,
+                "commits": self.commits,
+                "rollbacks": self.rollbacks,
+                "transaction_histogram": dict(zip(labels, self._transactions)),
+            }
+        queries.sort(key=lambda row: row["total_ms"], reverse=True)
+        report["queries"] = queries
+        return report
+
+
+def call_hook(hooks, name, *args):
+    """
+    Call hooks.<name>(*args) if `hooks` defines it. Hooks can be any object
+    (an instance, a module, a SimpleNamespace), or a list/tuple of them,
+    e.g. [ConsoleHooks(), metrics]; missing hooks are skipped.
+    """
+    if isinstance(hooks, (list, tuple)):
+        for each in hooks:
+            call_hook(each, name, *args)
+        return
+    hook = getattr(hooks, name, None)
+    if hook is not None:
+        hook(*args)
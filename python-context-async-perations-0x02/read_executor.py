@@ -0,0 +1,82 @@
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+db_connections = __import__('db_connections')
+
+
+class ReadExecutor:
+    """
+    Runs read queries on N worker threads, each owning one read-only
+    connection. aiosqlite funnels every call on a connection through a
+    single thread; here each query goes to whichever worker is free, and
+    because the sqlite3 module releases the GIL while SQLite executes a
+    statement, reads on different workers run in parallel across cores.
+    The database is switched to WAL once so readers never block on, or
+    block, a writer.
+        executor = ReadExecutor("users.db", readers=4)
+        rows = await executor.fetch("SELECT * FROM users WHERE age > ?", (25,))
+    """
+
+    def __init__(self, db_name="users.db", readers=4, profile="read_heavy"):
+        self.db_name = db_name
+        self.readers = readers
+        self.profile = profile
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.closed = False
+        with sqlite3.connect(db_name) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")  # persistent; needs a writable connection
+        conn.close()
+        self._executor = ThreadPoolExecutor(
+            max_workers=readers, thread_name_prefix="sqlite-reader",
+            initializer=self._open_reader)
+
+    def _open_reader(self):
+        conn = db_connections.connect(
+            f"file:{self.db_name}?mode=ro", self.profile, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only=ON")
+        self._local.conn = conn
+        with self._lock:
+            self._connections.append(conn)
+
+    def _run(self, query, params):
+        return self._local.conn.execute(query, params or ()).fetchall()
+
+    def submit(self, query, params=None):
+        """Queue a read and return a concurrent.futures.Future of its rows."""
+        return self._executor.submit(self._run, query, params)
+
+    async def fetch(self, query, params=None):
+        """Run a read on a free worker and return its rows."""
+        return await asyncio.wrap_future(self.submit(query, params))
+
+    def close(self):
+        """Wait for queued reads, stop the workers and close their connections."""
+        self.closed = True
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_read_executor(db_name="users.db", readers=4):
+    """Return the process-wide ReadExecutor for db_name, creating it once."""
+    with _executors_lock:
+        executor = _executors.get(db_name)
+        if executor is None or executor.closed:
+            executor = _executors[db_name] = ReadExecutor(db_name, readers)
+        return executor
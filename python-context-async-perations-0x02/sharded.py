@@ -0,0 +1,142 @@
+import heapq
+import asyncio
+from collections import namedtuple
+
+db_connections = __import__('db_connections')
+concurrent = __import__('3-concurrent')
+
+
+class ShardedResult(namedtuple("ShardedResult", "value errors")):
+    """
+    Outcome of a fan-out query: the merged value and {shard: exception} for
+    the shards that failed or timed out. With errors the value is partial.
+    """
+
+    @property
+    def partial(self):
+        return bool(self.errors)
+
+
+class ShardedEngine:
+    """
+    Runs one query on every SQLite shard concurrently, the fetch_query way
+    (a pooled aiosqlite connection per shard), and merges what comes back.
+    A shard that fails or takes longer than `timeout` seconds is reported
+    in ShardedResult.errors instead of failing the whole query; a timed-out
+    shard's statement is interrupted, as in fetch_query.
+        engine = ShardedEngine(["users_0.db", "users_1.db", "users_2.db"])
+        oldest = await engine.fetch_ordered(
+            "SELECT * FROM users ORDER BY age DESC LIMIT 10",
+            key=lambda row: row[3], reverse=True, limit=10)
+        average = await engine.avg("users", "age")
+    """
+
+    AGGREGATES = ("COUNT", "SUM", "AVG", "MIN", "MAX")
+
+    def __init__(self, shards, timeout=5.0, pool_size=4):
+        self.shards = list(shards)
+        self.timeout = timeout
+        self.pool_size = pool_size
+
+    async def _fetch_shard(self, shard, query, params):
+        pool = await db_connections.get_async_pool(shard, size=self.pool_size)
+        async with pool.connection() as conn:
+            # When the shard's timeout cancels us, the running statement is
+            # interrupted before the connection goes back to the pool
+            return shard, await concurrent._fetch_interruptible(conn, query, params, None)
+
+    async def _as_completed(self, query, params, errors):
+        """Yield (shard, rows) as each shard answers; record failures in errors."""
+        pending = {
+            asyncio.ensure_future(asyncio.wait_for(
+                self._fetch_shard(shard, query, params), self.timeout)): shard
+            for shard in self.shards
+        }
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    shard = pending.pop(task)
+                    try:
+                        yield task.result()
+                    except asyncio.TimeoutError:
+                        errors[shard] = asyncio.TimeoutError(
+                            f"shard {shard} timed out after {self.timeout}s")
+                    except Exception as e:
+                        errors[shard] = e
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch_all(self, query, params=None):
+        """Rows from every shard, concatenated in the order shards answer."""
+        errors = {}
+        rows = []
+        async for _, shard_rows in self._as_completed(query, params, errors):
+            rows.extend(shard_rows)
+        return ShardedResult(rows, errors)
+
+    async def fetch_ordered(self, query, params=None, key=None, reverse=False, limit=None):
+        """
+        K-way merge of per-shard results. The query's ORDER BY must sort
+        each shard the same way `key`/`reverse` do; with a LIMIT in the
+        query, pass the same `limit` to cut the merged result.
+        """
+        errors = {}
+        runs = [rows async for _, rows in self._as_completed(query, params, errors)]
+        merged = heapq.merge(*runs, key=key, reverse=reverse)
+        if limit is not None:
+            merged = (row for _, row in zip(range(limit), merged))
+        return ShardedResult(list(merged), errors)
+
+    async def aggregate(self, func, table, column="*", where=None, params=None):
+        """
+        COUNT/SUM/AVG/MIN/MAX of `column` over every shard. Each shard
+        returns partial aggregates (AVG as SUM and COUNT), combined as the
+        shards answer.
+        """
+        func = func.upper()
+        if func not in self.AGGREGATES:
+            raise ValueError(f"Unsupported aggregate: {func}")
+        clause = f" WHERE {where}" if where else ""
+        if func == "COUNT":
+            select = f"COUNT({column}), 0"
+        elif func == "AVG":
+            select = f"COUNT({column}), TOTAL({column})"
+        else:
+            select = f"{func}({column}), COUNT({column})"
+        query = f"SELECT {select} FROM {table}{clause}"
+
+        errors = {}
+        count, total, extreme = 0, 0, None
+        async for _, rows in self._as_completed(query, params, errors):
+            first, second = rows[0]
+            if func in ("COUNT", "AVG"):
+                count += first
+                total += second
+            elif func == "SUM":
+                if second:
+                    total += first
+                    count += second
+            elif first is not None:
+                pick = min if func == "MIN" else max
+                extreme = first if extreme is None else pick(extreme, first)
+
+        if func == "COUNT":
+            value = count
+        elif func == "AVG":
+            value = total / count if count else None
+        elif func == "SUM":
+            value = total if count else None
+        else:
+            value = extreme
+        return ShardedResult(value, errors)
+
+    async def count(self, table, where=None, params=None):
+        return await self.aggregate("COUNT", table, "*", where, params)
+
+    async def sum(self, table, column, where=None, params=None):
+        return await self.aggregate("SUM", table, column, where, params)
+
+    async def avg(self, table, column, where=None, params=None):
+        return await self.aggregate("AVG", table, column, where, params)
@@ -0,0 +1,138 @@
+import asyncio
+import aiosqlite
+
+db_connections = __import__('db_connections')
+
+
+class AsyncWriteQueue:
+    """
+    Funnels every write to a database through one writer task.
+    Concurrent writers against one SQLite file fight over its single write
+    lock and get "database is locked"; here callers only queue their write
+    and await a future. The writer owns the only write connection, waits up
+    to max_wait_ms after the first queued write (or until max_batch are
+    queued) and runs the batch in one transaction. Each write runs in its
+    own SAVEPOINT, so a failing write is rolled back on its own and only its
+    caller sees the exception.
+        async with AsyncWriteQueue("users.db") as writes:
+            await writes.execute("UPDATE users SET age = ? WHERE id = ?", (30, 1))
+    """
+
+    def __init__(self, db_name="users.db", max_batch=100, max_wait_ms=5, profile="write_heavy"):
+        self.db_name = db_name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.profile = profile
+        self.batches = 0
+        self._queue = None
+        self._writer = None
+
+    async def submit(self, func, *args):
+        """
+        Queue `await func(conn, *args)` and return its result once committed.
+        func runs inside the batch transaction and must not commit itself.
+        """
+        if self._writer is None or self._writer.done():
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((func, args, future))
+        return await future
+
+    async def execute(self, query, params=None):
+        """Queue one statement and return its rowcount once committed."""
+        return await self.submit(_execute, query, params)
+
+    async def _run(self):
+        queue = self._queue
+        conn = None
+        error = RuntimeError("write queue closed")
+        try:
+            conn = await aiosqlite.connect(self.db_name, isolation_level=None)
+            for pragma in db_connections.profile_pragmas(self.profile) if self.profile else ():
+                await conn.execute(pragma)
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                loop = asyncio.get_running_loop()
+                flush_at = loop.time() + self.max_wait
+                while len(batch) < self.max_batch:
+                    remaining = flush_at - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is None:
+                        queue.put_nowait(None)  # stop after this batch
+                        break
+                    batch.append(item)
+                await self._flush(conn, batch)
+        except Exception as e:
+            # e.g. the database cannot be opened: every queued caller gets
+            # the error, and the next submit() starts a new writer
+            error = e
+        finally:
+            if conn is not None:
+                await conn.close()
+            # No awaits from here on, so nothing can be queued behind the drain
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item is not None and not item[2].done():
+                    item[2].set_exception(error)
+
+    async def _flush(self, conn, batch):
+        """Run one batch in a single transaction and resolve its futures."""
+        self.batches += 1
+        outcomes = []
+        try:
+            await conn.execute("BEGIN IMMEDIATE")
+            for func, args, future in batch:
+                await conn.execute("SAVEPOINT op")
+                try:
+                    result = await func(conn, *args)
+                except Exception as e:
+                    await conn.execute("ROLLBACK TO op")
+                    await conn.execute("RELEASE op")
+                    outcomes.append((future, None, e))
+                else:
+                    await conn.execute("RELEASE op")
+                    outcomes.append((future, result, None))
+            await conn.execute("COMMIT")
+        except BaseException as e:
+            if conn.in_transaction:
+                await conn.rollback()
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e if isinstance(e, Exception) else RuntimeError("write queue closed"))
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        for future, result, error in outcomes:
+            if future.done():
+                continue  # the caller was cancelled; the write still committed
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    async def close(self):
+        """Commit pending writes and stop the writer task."""
+        if self._writer is not None and not self._writer.done():
+            self._queue.put_nowait(None)
+            await self._writer
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+async def _execute(conn, query, params):
+    async with conn.execute(query, params or ()) as cursor:
+        return cursor.rowcount
@@ -1,22 +1,236 @@
+import re
+import json
+import time
+import inspect
 import sqlite3
 import functools
 from datetime import datetime  # ✅ required import for timestamp logging
 
+log_sink = __import__('log_sink')
+stats = __import__('query_stats')
+
+# Query lines go through a background sink; lower sample_rate under load
+query_log = log_sink.get_sink(None)
+
+# "SCAN users" (or "SCAN TABLE users" on older SQLite) without an index
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?!.*\bUSING\b)")
+
 
 # ✅ Decorator to log SQL queries with timestamp
 def log_queries(func):
+    """
+    Log each SQL query and time it. Executions are aggregated per query
+    fingerprint in query_stats.query_stats (see its dump()/reset()).
+    Works on coroutine functions too. For generator functions the time
+    spent producing rows and the number of rows streamed are recorded when
+    the iterator finishes.
+    """
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            query = _log_query(args, kwargs)
+            rows = 0
+            elapsed = 0.0
+            generator = func(*args, **kwargs)
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        row = next(generator)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - start
+                    rows += 1
+                    yield row
+            finally:
+                generator.close()
+                if isinstance(query, str):
+                    stats.query_stats.record(query, elapsed, rows)
+        return generator_wrapper
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            query = _log_query(args, kwargs)
+            start = time.perf_counter()
+            result = await func(*args, **kwargs)
+            if isinstance(query, str):
+                stats.query_stats.record(query, time.perf_counter() - start, stats.row_count(result))
+            return result
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        query = kwargs.get('query') or (args[0] if args else None)
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        if query:
-            print(f"[{timestamp}] Executing SQL Query: {query}")
-        else:
-            print(f"[{timestamp}] No SQL query found to execute.")
-        return func(*args, **kwargs)
+        query = _log_query(args, kwargs)
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        if isinstance(query, str):
+            stats.query_stats.record(query, time.perf_counter() - start, stats.row_count(result))
+        return result
     return wrapper
 
 
+def _log_query(args, kwargs):
+    """Write the query line for a call and return the query found."""
+    query = kwargs.get('query') or (args[0] if args else None)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if query:
+        query_log.write(f"[{timestamp}] Executing SQL Query: {query}", sampled=True)
+    else:
+        query_log.write(f"[{timestamp}] No SQL query found to execute.", sampled=True)
+    return query
+
+
+class _ProfiledCursor:
+    """Cursor proxy that times execute() plus the fetches that follow it."""
+
+    def __init__(self, cursor, profile):
+        self._cursor = cursor
+        self._profile = profile
+        self._current = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._current is not None:
+                self._current["elapsed"] += time.perf_counter() - start
+
+    def execute(self, query, params=()):
+        self._current = {"query": query, "params": params, "elapsed": 0.0, "rows": 0}
+        self._profile.append(self._current)
+        self._timed(self._cursor.execute, query, params)
+        return self
+
+    def executemany(self, query, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        self._current = {"query": query, "params": seq_of_params[:1], "elapsed": 0.0,
+                         "rows": 0, "many": len(seq_of_params)}
+        self._profile.append(self._current)
+        self._timed(self._cursor.executemany, query, seq_of_params)
+        return self
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None and self._current is not None:
+            self._current["rows"] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(self._cursor.fetchmany, size or self._cursor.arraysize)
+        if self._current is not None:
+            self._current["rows"] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        if self._current is not None:
+            self._current["rows"] += len(rows)
+        return rows
+
+
+class _ProfiledConnection:
+    """Connection proxy whose cursors record every statement they run."""
+
+    def __init__(self, conn, profile):
+        self._conn = conn
+        self._profile = profile
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args):
+        return _ProfiledCursor(self._conn.cursor(*args), self._profile)
+
+    def execute(self, query, params=()):
+        return self.cursor().execute(query, params)
+
+    def executemany(self, query, seq_of_params):
+        return self.cursor().executemany(query, seq_of_params)
+
+
+def explain(conn, query, params=()):
+    """Return (plan details, fully scanned tables) for a statement."""
+    plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+    full_scans = [match.group(1) for match in map(FULL_SCAN.match, plan) if match]
+    return plan, full_scans
+
+
+def profile_queries(threshold_ms=100, database="users.db", log_path="slow_queries.log"):
+    """
+    Decorator that times every statement a function executes.
+    Statements slower than threshold_ms are explained with EXPLAIN QUERY
+    PLAN on the same connection and written to log_path as one JSON record
+    per line, with the bound parameters and any full table scans flagged.
+    Functions that take the connection as their first argument (as with
+    with_db_connection) are profiled per statement through a connection
+    proxy; otherwise the whole call is timed against its `query`/`params`
+    arguments and explained on a fresh connection to `database`.
+    """
+    threshold = threshold_ms / 1000
+    slow_log = log_sink.get_sink(log_path)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            conn = args[0] if args and isinstance(args[0], sqlite3.Connection) else None
+            profile = []
+            if conn is not None:
+                args = (_ProfiledConnection(conn, profile),) + args[1:]
+                result = func(*args, **kwargs)
+            else:
+                query = kwargs.get("query") or (args[0] if args else None)
+                start = time.perf_counter()
+                result = func(*args, **kwargs)
+                if isinstance(query, str):
+                    profile.append({"query": query, "params": kwargs.get("params") or (),
+                                    "elapsed": time.perf_counter() - start,
+                                    "rows": stats.row_count(result)})
+
+            for statement in profile:
+                stats.query_stats.record(statement["query"], statement["elapsed"], statement["rows"])
+                if statement["elapsed"] >= threshold:
+                    _record_slow(func, conn, statement)
+            return result
+
+        def _record_slow(func, conn, statement):
+            params = statement["params"]
+            if statement.get("many"):
+                params = params[0] if params else ()
+            try:
+                if conn is not None:
+                    plan, full_scans = explain(conn, statement["query"], params)
+                else:
+                    with sqlite3.connect(database) as explain_conn:
+                        plan, full_scans = explain(explain_conn, statement["query"], params)
+            except sqlite3.Error as e:
+                plan, full_scans = [f"EXPLAIN failed: {e}"], []
+            record = {
+                "timestamp": datetime.now().isoformat(),
+                "function": func.__name__,
+                "query": statement["query"],
+                "params": statement["params"],
+                "elapsed_ms": round(statement["elapsed"] * 1000, 3),
+                "rows": statement["rows"],
+                "plan": plan,
+                "full_scans": full_scans,
+            }
+            if statement.get("many"):
+                record["executions"] = statement["many"]
+            slow_log.write(json.dumps(record, default=repr))
+
+        return wrapper
+    return decorator
+
+
 @log_queries
 def fetch_all_users(query):
     """Fetch all users from SQLite database"""
@@ -28,7 +242,30 @@ def fetch_all_users(query):
     return results
 
 
+@log_queries
+def stream_all_users(query, chunk_size=500):
+    """Stream users from SQLite database in fetchmany chunks"""
+    conn = sqlite3.connect('users.db')
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
 # Example usage (only runs when this script is executed directly)
 if __name__ == "__main__":
     users = fetch_all_users(query="SELECT * FROM users")
+    query_log.flush()
     print(users)
+
+    # Profile with a 0 ms threshold so every statement lands in slow_queries.log
+    profiled = profile_queries(threshold_ms=0)(fetch_all_users.__wrapped__)
+    profiled(query="SELECT * FROM users WHERE age > 25")
+    log_sink.flush_all()
+    print(stats.query_stats.dump())
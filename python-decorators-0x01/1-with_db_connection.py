@@ -1,20 +1,99 @@
+import os
+import time
+import sys
+import random
+import inspect
 import sqlite3
+import tempfile
 import functools
+from contextlib import contextmanager
 
+deadline = __import__('deadline')
 
-def with_db_connection(func):
-    """Decorator to automatically open and close the database connection"""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        # Open database connection
-        conn = sqlite3.connect('users.db')
+# Profiles and pools are shared with python-context-async-perations-0x02
+connection_pool = __import__('connection_pool')
+DB_NAME = connection_pool.DB_NAME
+PROFILES = connection_pool.PROFILES
+profile_pragmas = connection_pool.profile_pragmas
+ConnectionPool = connection_pool.ConnectionPool
+get_pool = connection_pool.get_pool
+AsyncConnectionPool = connection_pool.AsyncConnectionPool
+get_async_pool = connection_pool.get_async_pool
+close_async_pools = connection_pool.close_async_pools
+
+
+def stream_rows(cursor, chunk_size=500):
+    """Yield a cursor's rows, fetching chunk_size rows at a time."""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield from rows
+
+
+@contextmanager
+def _connection(database, profile):
+    """
+    Open a fresh connection, or borrow one from the profile's pool.
+    Under a deadline, statements are interrupted once it passes.
+    """
+    deadline.check()
+    if profile is None:
+        conn = sqlite3.connect(database)
         try:
-            # Pass the connection to the wrapped function
-            result = func(conn, *args, **kwargs)
+            with deadline.interrupt_on_deadline(conn):
+                yield conn
         finally:
-            # Ensure the connection is always closed
             conn.close()
-        return result
+    else:
+        with get_pool(database, profile).connection() as conn:
+            with deadline.interrupt_on_deadline(conn):
+                yield conn
+
+
+def with_db_connection(func=None, *, profile=None, database=DB_NAME):
+    """
+    Decorator to automatically open and close the database connection.
+    Used bare it opens a fresh connection per call. With profile="read_heavy"
+    (or any name in PROFILES) it borrows a connection from that profile's
+    ConnectionPool instead, so the PRAGMAs are applied once per connection.
+    Coroutine functions instead borrow an aiosqlite connection from the
+    event loop's AsyncConnectionPool and return it when they finish.
+    Generator functions keep the connection open for as long as the
+    returned iterator lives: it is closed when the iterator is exhausted
+    or close()d, so rows can be streamed instead of fetched all at once.
+    Inside a deadline.deadline() block, running statements are interrupted
+    with DeadlineExceeded once the deadline passes.
+    """
+    if func is None:
+        return functools.partial(with_db_connection, profile=profile, database=database)
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            with _connection(database, profile) as conn:
+                yield from func(conn, *args, **kwargs)
+        return generator_wrapper
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            pool = await get_async_pool(database, profile)
+            deadline.check()
+            conn = await pool.acquire()
+            try:
+                async with deadline.interrupt_on_deadline_async(conn):
+                    return await func(conn, *args, **kwargs)
+            finally:
+                await pool.release(conn)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Open (or borrow) the database connection
+        with _connection(database, profile) as conn:
+            # Pass the connection to the wrapped function
+            return func(conn, *args, **kwargs)
     return wrapper
 
 
@@ -26,7 +105,64 @@ def get_user_by_id(conn, user_id):
     return cursor.fetchone()
 
 
+@with_db_connection
+def stream_users(conn, chunk_size=500):
+    """Stream every user without loading the whole table into memory"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users")
+    yield from stream_rows(cursor, chunk_size)
+
+
+def benchmark_profiles(users=20000, operations=5000):
+    """
+    Run our query mix against a fresh copy of a synthetic users table for
+    each profile and print operations per second. The mix is 70% point
+    lookups by id, 10% age range scans and 20% single-row email updates,
+    each update committed on its own like update_user_email.
+    Run it with: python 1-with_db_connection.py --benchmark
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for profile, pragmas in PROFILES.items():
+            if pragmas.get("query_only"):
+                continue  # the mix includes writes
+            database = os.path.join(scratch, f"{profile}.db")
+            with sqlite3.connect(database) as conn:
+                conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)")
+                conn.executemany(
+                    "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+                    ((f"user{i}", f"user{i}@example.com", 18 + i % 70) for i in range(users)),
+                )
+            conn.close()
+
+            pool = ConnectionPool(database, profile, size=1)
+            rng = random.Random(42)
+            start = time.perf_counter()
+            with pool.connection() as conn:
+                for _ in range(operations):
+                    pick = rng.random()
+                    user_id = rng.randrange(1, users + 1)
+                    if pick < 0.7:
+                        conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+                    elif pick < 0.8:
+                        age = rng.randrange(18, 80)
+                        conn.execute("SELECT * FROM users WHERE age BETWEEN ? AND ?", (age, age + 2)).fetchall()
+                    else:
+                        conn.execute("UPDATE users SET email = ? WHERE id = ?", (f"new{user_id}@example.com", user_id))
+                        conn.commit()
+            results[profile] = operations / (time.perf_counter() - start)
+            pool.close()
+
+    for profile, throughput in results.items():
+        print(f"{profile:>12}: {throughput:10.0f} ops/s")
+    return results
+
+
 # Example usage (only runs when executed directly)
 if __name__ == "__main__":
     user = get_user_by_id(user_id=1)
     print(user)
+    for row in stream_users(chunk_size=100):
+        print(row)
+    if "--benchmark" in sys.argv:
+        benchmark_profiles()
@@ -1,41 +1,182 @@
 import sqlite3
+import inspect
 import functools
 from datetime import datetime
 
-
-def with_db_connection(func):
-    """Decorator to handle opening and closing the database connection automatically"""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
-        try:
-            result = func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-        return result
-    return wrapper
+with_db_connection = __import__('1-with_db_connection').with_db_connection
+cache = __import__('4-cache_query')
+log_sink = __import__('log_sink')
 
 
 def log_transaction(message):
     """Helper function to log transaction activity with timestamps"""
-    with open("transactions.log", "a") as log_file:
-        log_file.write(f"{datetime.now()} - {message}\n")
+    log_sink.get_sink("transactions.log").write(f"{datetime.now()} - {message}")
+
+
+# id(conn) -> read_only flag of each transactional call active on it,
+# outermost first; the list's length is the nesting depth
+_depth = {}
+
+
+def _enter(conn, read_only=False):
+    """
+    Register a transactional call on conn and return its nesting depth.
+    A writing call nested inside a read-only one is refused: the outer
+    call ends with a rollback, which would silently discard its writes.
+    """
+    active = _depth.setdefault(id(conn), [])
+    if not read_only and any(active):
+        raise sqlite3.ProgrammingError(
+            "cannot run a writing transactional call inside a read_only one")
+    active.append(read_only)
+    return len(active)
+
+
+def _exit(conn, depth):
+    if depth == 1:
+        del _depth[id(conn)]
+    else:
+        _depth[id(conn)].pop()
+
 
+def transactional(func=None, *, read_only=False):
+    """
+    Decorator to manage database transactions automatically.
+    Cached queries that read a table written by the transaction are
+    invalidated once it commits. Coroutine functions are awaited and
+    committed or rolled back on their aiosqlite connection.
+
+    Calls nested inside another transactional function on the same
+    connection run in a SAVEPOINT instead of their own transaction: a
+    failure rolls back only that call, and the outermost call commits.
+    The same applies when the connection already has an uncommitted
+    transaction of the caller's: a failure leaves the caller's writes in
+    place, and a success commits them along with this call's.
+
+    read_only=True is a fast path for functions that only read: it opens
+    a deferred read transaction for a consistent snapshot and ends it
+    without a commit or a transactions.log entry. Writing transactional
+    calls nested inside it raise sqlite3.ProgrammingError. Pair it with
+    @with_db_connection(profile="read_only") to run on a separate pool of
+    query_only connections.
+    """
+    if func is None:
+        return functools.partial(transactional, read_only=read_only)
+    if inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func):
+        # The transaction would end before the caller consumes the rows
+        raise TypeError(f"transactional cannot wrap generator function {func.__name__}")
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(conn, *args, **kwargs):
+            depth = _enter(conn, read_only)
+            try:
+                if depth > 1:
+                    if read_only:
+                        return await func(conn, *args, **kwargs)
+                    savepoint = f"transactional_{depth}"
+                    await conn.execute(f"SAVEPOINT {savepoint}")
+                    try:
+                        result = await func(conn, *args, **kwargs)
+                    except BaseException:
+                        await conn.execute(f"ROLLBACK TO {savepoint}")
+                        await conn.execute(f"RELEASE {savepoint}")
+                        raise
+                    await conn.execute(f"RELEASE {savepoint}")
+                    return result
+
+                if read_only:
+                    if conn.in_transaction:
+                        return await func(conn, *args, **kwargs)
+                    await conn.execute("BEGIN DEFERRED")
+                    try:
+                        return await func(conn, *args, **kwargs)
+                    finally:
+                        await conn.rollback()
+
+                savepoint = "transactional_1" if conn.in_transaction else None
+                try:
+                    await conn.execute(f"SAVEPOINT {savepoint}" if savepoint else "BEGIN")
+                    async with cache.track_tables_async(conn, cache.WRITE_ACTIONS) as written:
+                        result = await func(conn, *args, **kwargs)
+                    if savepoint:
+                        await conn.execute(f"RELEASE {savepoint}")
+                        savepoint = None
+                    await conn.commit()
+                    cache.invalidate_tables(written)
+                    log_transaction(f"COMMIT: {func.__name__} executed successfully")
+                except Exception as e:
+                    if savepoint:
+                        await conn.execute(f"ROLLBACK TO {savepoint}")
+                        await conn.execute(f"RELEASE {savepoint}")
+                    else:
+                        await conn.rollback()
+                    log_transaction(f"ROLLBACK: {func.__name__} failed with error: {e}")
+                    print(f"Transaction rolled back due to error: {e}")
+                    raise
+                return result
+            finally:
+                _exit(conn, depth)
+        return async_wrapper
 
-def transactional(func):
-    """Decorator to manage database transactions automatically"""
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
+        depth = _enter(conn, read_only)
         try:
-            result = func(conn, *args, **kwargs)
-            conn.commit()
-            log_transaction(f"COMMIT: {func.__name__} executed successfully")
-        except Exception as e:
-            conn.rollback()
-            log_transaction(f"ROLLBACK: {func.__name__} failed with error: {e}")
-            print(f"Transaction rolled back due to error: {e}")
-            raise
-        return result
+            if depth > 1:
+                if read_only:
+                    return func(conn, *args, **kwargs)
+                savepoint = f"transactional_{depth}"
+                conn.execute(f"SAVEPOINT {savepoint}")
+                try:
+                    result = func(conn, *args, **kwargs)
+                except BaseException:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                    raise
+                conn.execute(f"RELEASE {savepoint}")
+                return result
+
+            if read_only:
+                if conn.in_transaction:
+                    # Read inside the caller's transaction; ending it here
+                    # would discard the caller's uncommitted writes
+                    return func(conn, *args, **kwargs)
+                conn.execute("BEGIN DEFERRED")
+                try:
+                    return func(conn, *args, **kwargs)
+                finally:
+                    # Nothing to make durable: ending the snapshot is enough
+                    conn.rollback()
+
+            # The caller may already have written on this connection without
+            # committing; a SAVEPOINT then joins that transaction, so a
+            # failure rolls back only this call and a success commits both
+            savepoint = "transactional_1" if conn.in_transaction else None
+            try:
+                # An explicit BEGIN keeps nested SAVEPOINTs inside this
+                # transaction even before the first write
+                conn.execute(f"SAVEPOINT {savepoint}" if savepoint else "BEGIN")
+                with cache.track_tables(conn, cache.WRITE_ACTIONS) as written:
+                    result = func(conn, *args, **kwargs)
+                if savepoint:
+                    conn.execute(f"RELEASE {savepoint}")
+                    savepoint = None
+                conn.commit()
+                cache.invalidate_tables(written)
+                log_transaction(f"COMMIT: {func.__name__} executed successfully")
+            except Exception as e:
+                if savepoint:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                else:
+                    conn.rollback()
+                log_transaction(f"ROLLBACK: {func.__name__} failed with error: {e}")
+                print(f"Transaction rolled back due to error: {e}")
+                raise
+            return result
+        finally:
+            _exit(conn, depth)
     return wrapper
 
 
@@ -47,7 +188,18 @@ def update_user_email(conn, user_id, new_email):
     cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
 
 
+@with_db_connection(profile="read_only")
+@transactional(read_only=True)
+def get_user_email(conn, user_id):
+    """Read a user's email on the read-only pool without committing"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT email FROM users WHERE id = ?", (user_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
 # Example usage (only runs when executed directly)
 if __name__ == "__main__":
     update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
     print("User email updated successfully.")
+    print("Current email:", get_user_email(user_id=1))
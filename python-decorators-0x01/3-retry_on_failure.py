@@ -1,61 +1,339 @@
 import time
+import random
+import asyncio
+import inspect
 import sqlite3
 import functools
+import threading
 from datetime import datetime
 
+with_db_connection = __import__('1-with_db_connection').with_db_connection
+log_sink = __import__('log_sink')
+deadline = __import__('deadline')
+
+# Don't start another attempt with less than this many seconds left
+MIN_ATTEMPT_TIME = 0.05
+
 
 def log_message(message):
     """Helper to log messages to retry.log with timestamp"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open("retry.log", "a") as log_file:
-        log_file.write(f"[{timestamp}] {message}\n")
+    log_sink.get_sink("retry.log").write(f"[{timestamp}] {message}")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the database while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated OperationalErrors.
+    CLOSED: calls go through; failure_threshold consecutive failures open it.
+    OPEN: calls raise CircuitOpenError until reset_timeout seconds pass.
+    HALF_OPEN: one probe call is let through; success closes the circuit,
+    failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.short_circuited = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may proceed."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.short_circuited += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    self.short_circuited += 1
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """
+        Give back a half-open probe that ended without an answer from the
+        database (cancelled, interrupted by a deadline), so the next call
+        can probe instead of the circuit staying half-open for good.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        """Count an OperationalError, opening the circuit when needed."""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opens += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+
+class RetryBudget:
+    """
+    Caps retries to a share of traffic for the whole process.
+    Every call deposits `ratio` tokens and every retry spends one, so at most
+    about ratio * calls are retries; min_per_sec tokens are added over time
+    so a quiet process can still recover from a blip.
+    """
+
+    def __init__(self, ratio=0.1, min_per_sec=1.0, max_tokens=10.0):
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.calls = 0
+        self.retries = 0
+        self.exhausted = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record_call(self):
+        """Deposit the share of a call that may be spent on retries."""
+        with self._lock:
+            self.calls += 1
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self):
+        """Take one retry token; return False if the budget is exhausted."""
+        with self._lock:
+            now = time.monotonic()
+            refill = (now - self._updated) * self.min_per_sec
+            self.tokens = min(self.max_tokens, self.tokens + refill)
+            self._updated = now
+            if self.tokens < 1:
+                self.exhausted += 1
+                return False
+            self.tokens -= 1
+            self.retries += 1
+            return True
+
+
+default_breaker = CircuitBreaker()
+default_budget = RetryBudget()
 
 
-def with_db_connection(func):
-    """Decorator to automatically handle database connection opening and closing"""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
-        try:
-            result = func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-        return result
-    return wrapper
+def backoff_delay(attempt, delay, backoff=2, max_delay=30, jitter=True):
+    """
+    Seconds to wait before retry number `attempt` (1-based): exponential
+    backoff capped at max_delay, with full jitter so workers that failed
+    together do not retry together.
+    """
+    ceiling = min(max_delay, delay * backoff ** (attempt - 1))
+    return random.uniform(0, ceiling) if jitter else ceiling
+
 
+def retry_metrics(breaker=None, budget=None):
+    """Snapshot of circuit breaker state and retry counters."""
+    breaker = breaker or default_breaker
+    budget = budget or default_budget
+    return {
+        "breaker_state": breaker.state,
+        "breaker_failures": breaker.failures,
+        "breaker_opens": breaker.opens,
+        "short_circuited": breaker.short_circuited,
+        "calls": budget.calls,
+        "retries": budget.retries,
+        "retry_budget_exhausted": budget.exhausted,
+        "retry_tokens": round(budget.tokens, 2),
+    }
 
-def retry_on_failure(retries=3, delay=2):
+
+def retry_on_failure(retries=3, delay=2, backoff=2, max_delay=30, jitter=True,
+                     breaker=None, budget=None):
     """
     Decorator that retries a database function if it raises an exception.
-    Retries up to 'retries' times with 'delay' seconds between attempts.
+    Retries up to 'retries' times, sleeping an exponentially growing,
+    jittered delay (starting from 'delay' seconds) between attempts.
+    Retries draw on a per-process RetryBudget, and a CircuitBreaker fails
+    fast with CircuitOpenError after repeated OperationalErrors.
+    Coroutine functions are awaited and back off with asyncio.sleep.
+    Generator functions are retried only until they yield their first row;
+    rows already handed to the caller cannot be replayed.
+    Inside a deadline.deadline() block no retry is started that could not
+    finish in time; DeadlineExceeded is raised instead.
     Logs all retry attempts and failures to retry.log.
     """
     def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                active_breaker = breaker or default_breaker
+                active_budget = budget or default_budget
+                active_budget.record_call()
+                attempt = 0
+                while attempt < retries:
+                    _before_attempt(func, active_breaker)
+                    generator = func(*args, **kwargs)
+                    try:
+                        first = next(generator)
+                    except StopIteration:
+                        active_breaker.record_success()
+                        return
+                    except sqlite3.OperationalError as e:
+                        attempt += 1
+                        pause = retry_delay(e, attempt, retries, active_breaker, active_budget,
+                                            (delay, backoff, max_delay, jitter))
+                        if pause is None:
+                            raise
+                        time.sleep(pause)
+                        continue
+                    except Exception as e:
+                        _abort(e, active_breaker)
+                        raise
+                    except BaseException:
+                        active_breaker.release()
+                        raise
+                    active_breaker.record_success()
+                    try:
+                        yield first
+                        yield from generator
+                    finally:
+                        generator.close()
+                    return
+                raise _give_up(retries)
+            return generator_wrapper
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                active_breaker = breaker or default_breaker
+                active_budget = budget or default_budget
+                active_budget.record_call()
+                attempt = 0
+                while attempt < retries:
+                    _before_attempt(func, active_breaker)
+                    try:
+                        result = await func(*args, **kwargs)
+                    except sqlite3.OperationalError as e:
+                        attempt += 1
+                        pause = retry_delay(e, attempt, retries, active_breaker, active_budget,
+                                            (delay, backoff, max_delay, jitter))
+                        if pause is None:
+                            raise
+                        await asyncio.sleep(pause)
+                    except Exception as e:
+                        _abort(e, active_breaker)
+                        raise
+                    except BaseException:
+                        active_breaker.release()
+                        raise
+                    else:
+                        active_breaker.record_success()
+                        return result
+                raise _give_up(retries)
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            active_breaker = breaker or default_breaker
+            active_budget = budget or default_budget
+            active_budget.record_call()
             attempt = 0
             while attempt < retries:
+                _before_attempt(func, active_breaker)
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
                 except sqlite3.OperationalError as e:
                     attempt += 1
-                    msg = f"Transient error: {e}. Retry {attempt}/{retries}..."
-                    print(msg)
-                    log_message(msg)
-                    time.sleep(delay)
+                    pause = retry_delay(e, attempt, retries, active_breaker, active_budget,
+                                        (delay, backoff, max_delay, jitter))
+                    if pause is None:
+                        raise
+                    time.sleep(pause)
                 except Exception as e:
-                    msg = f"Fatal error: {e}. Aborting retries."
-                    print(msg)
-                    log_message(msg)
+                    _abort(e, active_breaker)
                     raise
-            msg = f"Operation failed after {retries} retries."
-            print(msg)
-            log_message(msg)
-            raise Exception(msg)
+                except BaseException:
+                    active_breaker.release()
+                    raise
+                else:
+                    active_breaker.record_success()
+                    return result
+            raise _give_up(retries)
         return wrapper
     return decorator
 
 
+def _before_attempt(func, breaker):
+    """Raise if the deadline has passed or the breaker rejects the call."""
+    deadline.check()
+    if not breaker.allow():
+        msg = f"Circuit open: skipping {func.__name__}."
+        log_message(msg)
+        raise CircuitOpenError(msg)
+
+
+def retry_delay(error, attempt, retries, breaker, budget, backoff_args):
+    """
+    Record a transient error and return the seconds to wait before the next
+    attempt (0 after the last one), or None if the retry budget is spent.
+    Raises DeadlineExceeded when the request's deadline would pass before
+    another attempt could finish.
+    """
+    left = deadline.remaining()
+    if left is not None and left <= 0 and "interrupted" in str(error):
+        # Our own deadline interrupted the query; the database is fine
+        breaker.release()
+        raise deadline.DeadlineExceeded("deadline exceeded while the query was running") from error
+    breaker.record_failure()
+    msg = f"Transient error: {error}. Retry {attempt}/{retries}..."
+    print(msg)
+    log_message(msg)
+    if attempt >= retries:
+        return 0
+    pause = backoff_delay(attempt, *backoff_args)
+    if left is not None and left < pause + MIN_ATTEMPT_TIME:
+        msg = f"Deadline too close ({max(left, 0):.3f}s left). Aborting retries."
+        print(msg)
+        log_message(msg)
+        raise deadline.DeadlineExceeded(msg) from error
+    if not budget.try_spend():
+        msg = "Retry budget exhausted. Aborting retries."
+        print(msg)
+        log_message(msg)
+        return None
+    return pause
+
+
+def _abort(error, breaker):
+    """Log a non-transient error; the database answered, so the breaker resets."""
+    breaker.record_success()
+    msg = f"Fatal error: {error}. Aborting retries."
+    print(msg)
+    log_message(msg)
+
+
+def _give_up(retries):
+    """Log and build the exception raised once every attempt failed."""
+    msg = f"Operation failed after {retries} retries."
+    print(msg)
+    log_message(msg)
+    return Exception(msg)
+
+
 @with_db_connection
 @retry_on_failure(retries=3, delay=1)
 def fetch_users_with_retry(conn):
@@ -65,6 +343,19 @@ def fetch_users_with_retry(conn):
     return cursor.fetchall()
 
 
+@with_db_connection
+@retry_on_failure(retries=3, delay=1)
+def stream_users_with_retry(conn, chunk_size=500):
+    """Stream all users in fetchmany chunks, retrying until the first row arrives"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users")
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield from rows
+
+
 if __name__ == "__main__":
     try:
         users = fetch_users_with_retry()
@@ -72,3 +363,4 @@ if __name__ == "__main__":
     except Exception as e:
         log_message(f"Final failure: {e}")
         print(f"Final failure: {e}")
+    print(retry_metrics())
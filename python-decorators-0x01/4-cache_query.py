@@ -1,53 +1,404 @@
+import os
+import re
 import time
+import asyncio
+import inspect
+import pickle
 import sqlite3
 import functools
+import threading
+from contextlib import contextmanager, asynccontextmanager
 from datetime import datetime
 
+with_db_connection = __import__('1-with_db_connection').with_db_connection
+
 
 query_cache = {}
 CACHE_TTL = 300  # cache expiry time in seconds (5 minutes)
 
+# table name -> set of cached queries that read from it
+table_dependencies = {}
+# id(conn) -> stack of (actions, tables) for nested track_tables() blocks
+_active_trackers = {}
+# (event loop, query) -> future of the fetch in flight, for async single-flight
+_inflight = {}
 
-def with_db_connection(func):
-    """Decorator to automatically handle database connection opening and closing"""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
+READ_ACTIONS = frozenset({sqlite3.SQLITE_READ})
+WRITE_ACTIONS = frozenset({
+    sqlite3.SQLITE_INSERT,
+    sqlite3.SQLITE_UPDATE,
+    sqlite3.SQLITE_DELETE,
+})
+TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+[\"`\[]?(\w+)", re.IGNORECASE)
+
+
+class MemoryCacheBackend:
+    """
+    Per-process cache backend (the default).
+    Stores results in the module-level query_cache/table_dependencies dicts.
+    Every backend tracks a per-table invalidation epoch so a result fetched
+    while a write to one of its tables was committing is never stored.
+    """
+
+    def __init__(self, entries=None, dependencies=None, max_entries=None):
+        self.entries = query_cache if entries is None else entries
+        self.dependencies = table_dependencies if dependencies is None else dependencies
+        self.max_entries = max_entries
+        self.table_epochs = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def epoch(self):
+        """Return the current invalidation epoch."""
+        return self._epoch
+
+    def get(self, query):
+        """Return (cached_time, result) for a query, or None."""
+        return self.entries.get(query)
+
+    def set(self, query, tables, started_epoch, cached_at, result):
+        """Cache a result unless one of its tables was written since started_epoch."""
+        with self._lock:
+            if any(self.table_epochs.get(table, 0) > started_epoch for table in tables):
+                return
+            self.entries.pop(query, None)
+            self.entries[query] = (cached_at, result)
+            for table in tables:
+                self.dependencies.setdefault(table, set()).add(query)
+            # dicts keep insertion order, so the first key is the oldest entry
+            while self.max_entries and len(self.entries) > self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+
+    def invalidate(self, tables):
+        """Drop the entries that depend on the given tables and return their queries."""
+        dropped = []
+        with self._lock:
+            self._epoch += 1
+            for table in tables:
+                self.table_epochs[table] = self._epoch
+                for query in self.dependencies.pop(table, ()):
+                    if self.entries.pop(query, None) is not None:
+                        dropped.append((table, query))
+        return dropped
+
+    def clear(self):
+        """Remove every cached entry."""
+        with self._lock:
+            self.entries.clear()
+            self.dependencies.clear()
+
+
+class SQLiteCacheBackend:
+    """
+    Cache backend shared by every process on the node through a SQLite file.
+    Results are pickled, so only point it at a file the application owns.
+    TTL, table-dependency invalidation and max_entries eviction behave as
+    in MemoryCacheBackend; a write in one worker invalidates all of them.
+    """
+
+    def __init__(self, path="query_cache.db", max_entries=None, timeout=5.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        """Return this thread's connection, reopening it after a fork."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                query TEXT PRIMARY KEY, cached_at REAL, result BLOB);
+            CREATE INDEX IF NOT EXISTS entries_cached_at ON entries (cached_at);
+            CREATE TABLE IF NOT EXISTS dependencies (
+                table_name TEXT, query TEXT, PRIMARY KEY (table_name, query));
+            CREATE TABLE IF NOT EXISTS epochs (
+                table_name TEXT PRIMARY KEY, epoch INTEGER);
+        """)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def epoch(self):
+        """Return the current invalidation epoch."""
+        row = self._connect().execute("SELECT COALESCE(MAX(epoch), 0) FROM epochs").fetchone()
+        return row[0]
+
+    def get(self, query):
+        """Return (cached_time, result) for a query, or None."""
+        row = self._connect().execute(
+            "SELECT cached_at, result FROM entries WHERE query = ?", (query,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], pickle.loads(row[1])
+
+    def set(self, query, tables, started_epoch, cached_at, result):
+        """Cache a result unless one of its tables was written since started_epoch."""
+        conn = self._connect()
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        tables = list(tables)
+        conn.execute("BEGIN IMMEDIATE")
         try:
-            result = func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-        return result
-    return wrapper
+            if tables:
+                marks = ",".join("?" * len(tables))
+                newer = conn.execute(
+                    f"SELECT 1 FROM epochs WHERE table_name IN ({marks}) AND epoch > ? LIMIT 1",
+                    (*tables, started_epoch),
+                ).fetchone()
+                if newer:
+                    conn.execute("ROLLBACK")
+                    return
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (query, cached_at, result) VALUES (?, ?, ?)",
+                (query, cached_at, payload),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO dependencies (table_name, query) VALUES (?, ?)",
+                [(table, query) for table in tables],
+            )
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn):
+        """Purge expired entries, then the oldest ones beyond max_entries."""
+        stale = "SELECT query FROM entries WHERE cached_at < ?"
+        params = (time.time() - CACHE_TTL,)
+        if self.max_entries:
+            stale += (" OR query IN (SELECT query FROM entries"
+                      " ORDER BY cached_at DESC LIMIT -1 OFFSET ?)")
+            params += (self.max_entries,)
+        conn.execute(f"DELETE FROM dependencies WHERE query IN ({stale})", params)
+        conn.execute(f"DELETE FROM entries WHERE query IN ({stale})", params)
+
+    def invalidate(self, tables):
+        """Drop the entries that depend on the given tables and return their queries."""
+        conn = self._connect()
+        tables = list(tables)
+        marks = ",".join("?" * len(tables))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            epoch = conn.execute("SELECT COALESCE(MAX(epoch), 0) + 1 FROM epochs").fetchone()[0]
+            conn.executemany(
+                "INSERT OR REPLACE INTO epochs (table_name, epoch) VALUES (?, ?)",
+                [(table, epoch) for table in tables],
+            )
+            dropped = conn.execute(
+                f"SELECT d.table_name, d.query FROM dependencies d JOIN entries e"
+                f" ON e.query = d.query WHERE d.table_name IN ({marks})",
+                tables,
+            ).fetchall()
+            queries = [(query,) for _, query in dropped]
+            conn.executemany("DELETE FROM entries WHERE query = ?", queries)
+            conn.executemany("DELETE FROM dependencies WHERE query = ?", queries)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return dropped
+
+    def clear(self):
+        """Remove every cached entry."""
+        self._connect().executescript("DELETE FROM entries; DELETE FROM dependencies;")
+
+
+cache_backend = MemoryCacheBackend()
+
+
+def set_cache_backend(backend):
+    """Switch the backend used by every cache_query-decorated function."""
+    global cache_backend
+    cache_backend = backend
+    return backend
+
+
+def _push_tracker(conn, actions):
+    """Register a tracker on conn; return its table set and, for the
+    outermost tracker, the authorizer that has to be installed."""
+    tables = set()
+    key = id(conn)
+    stack = _active_trackers.setdefault(key, [])
+    stack.append((actions, tables))
+    if len(stack) > 1:
+        return tables, None
+
+    def authorizer(action, arg1, arg2, db_name, trigger):
+        for wanted, seen in _active_trackers.get(key, ()):
+            if action in wanted and arg1:
+                seen.add(arg1)
+        return sqlite3.SQLITE_OK
+    return tables, authorizer
+
+
+def _pop_tracker(conn):
+    """Unregister the innermost tracker; return True if it was the last one."""
+    key = id(conn)
+    stack = _active_trackers[key]
+    stack.pop()
+    if stack:
+        return False
+    del _active_trackers[key]
+    return True
+
+
+@contextmanager
+def track_tables(conn, actions):
+    """
+    Record the tables touched through `conn` while the block runs.
+    Uses the SQLite authorizer, so views, joins and subqueries are resolved
+    to the real tables; `actions` selects reads (READ_ACTIONS) or writes
+    (WRITE_ACTIONS). Blocks may be nested on the same connection.
+    """
+    if not hasattr(conn, "set_authorizer"):
+        yield set()
+        return
+
+    tables, authorizer = _push_tracker(conn, actions)
+    if authorizer:
+        conn.set_authorizer(authorizer)
+    try:
+        yield tables
+    finally:
+        if _pop_tracker(conn):
+            conn.set_authorizer(None)
+
+
+@asynccontextmanager
+async def track_tables_async(conn, actions):
+    """track_tables() for aiosqlite connections."""
+    if not hasattr(conn, "set_authorizer"):
+        yield set()
+        return
+
+    tables, authorizer = _push_tracker(conn, actions)
+    if authorizer:
+        await conn.set_authorizer(authorizer)
+    try:
+        yield tables
+    finally:
+        if _pop_tracker(conn):
+            await conn.set_authorizer(None)
+
+
+def invalidate_tables(tables):
+    """Drop every cached result that depends on any of the given tables."""
+    if not tables:
+        return
+    for table, query in cache_backend.invalidate(tables):
+        print(f"[{datetime.now()}] Cache invalidated for query: {query} (table '{table}' changed)")
 
 
 def cache_query(func):
     """
     Decorator to cache query results based on SQL query string with TTL expiration.
     Avoids redundant database calls within the cache duration.
+    The tables each query reads are recorded so writes made through
+    transactional or ExecuteQuery invalidate only the dependent entries.
+    Coroutine functions get an async wrapper with single-flight misses:
+    concurrent callers of the same uncached query share one fetch. If the
+    caller running it is cancelled, the others retry instead of failing.
+    Generator (streaming) functions are rejected: caching a stream would
+    store an iterator that is used up after its first consumer.
     """
+    if inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func):
+        raise TypeError(f"cache_query cannot cache generator function {func.__name__}; "
+                        "return a list instead")
+    if inspect.iscoroutinefunction(func):
+        return _cache_query_async(func)
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         query = kwargs.get("query")
         current_time = time.time()
-
-        # If cached and still valid
-        if query in query_cache:
-            cached_time, result = query_cache[query]
-            if current_time - cached_time < CACHE_TTL:
-                print(f"[{datetime.now()}] Cache hit for query: {query}")
-                return result
-            else:
-                print(f"[{datetime.now()}] Cache expired for query: {query}. Refreshing cache...")
+        cached = _lookup(query, current_time)
+        if cached is not None:
+            return cached[1]
 
         # Otherwise, execute the function and store in cache
         print(f"[{datetime.now()}] Cache miss for query: {query}. Fetching from DB...")
-        result = func(*args, **kwargs)
-        query_cache[query] = (current_time, result)
+        started_epoch = cache_backend.epoch()
+        conn = args[0] if args else None
+        with track_tables(conn, READ_ACTIONS) as tables:
+            result = func(*args, **kwargs)
+        if not tables and query:
+            tables = set(TABLE_PATTERN.findall(query))
+        cache_backend.set(query, tables, started_epoch, current_time, result)
         return result
     return wrapper
 
 
+def _lookup(query, current_time):
+    """Return the (cached_time, result) pair if cached and still valid."""
+    cached = cache_backend.get(query)
+    if cached is not None:
+        cached_time, result = cached
+        if current_time - cached_time < CACHE_TTL:
+            print(f"[{datetime.now()}] Cache hit for query: {query}")
+            return cached
+        print(f"[{datetime.now()}] Cache expired for query: {query}. Refreshing cache...")
+    return None
+
+
+def _cache_query_async(func):
+    """Async variant of cache_query with single-flight cache misses."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        query = kwargs.get("query")
+        current_time = time.time()
+        cached = _lookup(query, current_time)
+        if cached is not None:
+            return cached[1]
+
+        key = (asyncio.get_running_loop(), query)
+        while True:
+            pending = _inflight.get(key)
+            if pending is None:
+                break
+            print(f"[{datetime.now()}] Cache miss for query: {query}. Joining fetch in flight...")
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Only the caller running the fetch was cancelled: the rest
+                # retry, and the first of them runs the fetch itself
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            cached = _lookup(query, time.time())
+            if cached is not None:
+                return cached[1]
+
+        print(f"[{datetime.now()}] Cache miss for query: {query}. Fetching from DB...")
+        pending = _inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            started_epoch = cache_backend.epoch()
+            conn = args[0] if args else None
+            async with track_tables_async(conn, READ_ACTIONS) as tables:
+                result = await func(*args, **kwargs)
+            if not tables and query:
+                tables = set(TABLE_PATTERN.findall(query))
+            cache_backend.set(query, tables, started_epoch, current_time, result)
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            # Mark the exception retrieved when nobody else was waiting
+            pending.exception()
+            raise
+        else:
+            pending.set_result(result)
+            return result
+        finally:
+            del _inflight[key]
+    return wrapper
+
+
 @with_db_connection
 @cache_query
 def fetch_users_with_cache(conn, query):
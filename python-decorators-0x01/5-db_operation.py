@@ -0,0 +1,217 @@
+import os
+import time
+import sqlite3
+import sys
+import inspect
+import tempfile
+import functools
+import contextlib
+from datetime import datetime
+
+query_logging = __import__('0-log_queries')
+log_queries = query_logging.log_queries
+connections = __import__('1-with_db_connection')
+with_db_connection = connections.with_db_connection
+transactions = __import__('2-transactional')
+retries_module = __import__('3-retry_on_failure')
+cache = __import__('4-cache_query')
+deadline = __import__('deadline')
+log_sink = __import__('log_sink')
+stats = __import__('query_stats')
+
+
+def db_operation(database="users.db", log=True, transactional=True, retries=3, delay=2,
+                 backoff=2, max_delay=30, jitter=True, breaker=None, budget=None, profile=None):
+    """
+    Composite decorator equivalent to stacking
+        @with_db_connection
+        @transactional
+        @retry_on_failure(retries, delay, backoff, max_delay, jitter, breaker, budget)
+        @log_queries
+    but built as a single wrapper. Everything that does not change between
+    calls (where the query argument sits, which layers are enabled) is
+    resolved once at decoration time instead of on every call.
+    Pass log=False, transactional=False or retries=0 to drop a layer, and
+    profile="read_heavy" (etc.) to use a pooled, profiled connection.
+    Only plain functions are supported: coroutine and generator functions
+    raise TypeError, since the fused wrapper is synchronous.
+    """
+    def decorator(func):
+        name = func.__name__
+        if (inspect.iscoroutinefunction(func) or inspect.isgeneratorfunction(func)
+                or inspect.isasyncgenfunction(func)):
+            # The wrapper would commit and close the connection before the
+            # body ran; stack the individual decorators for these instead
+            raise TypeError(f"db_operation cannot wrap coroutine or generator function {name}; "
+                            "stack with_db_connection, transactional, retry_on_failure and "
+                            "log_queries instead")
+        # Locate the query argument once. The connection is injected as the
+        # first parameter, so callers' positional arguments start after it.
+        params = list(inspect.signature(func).parameters)[1:]
+        query_index = params.index("query") if "query" in params else 0
+        pool = connections.get_pool(database, profile) if profile else None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            deadline.check()
+            conn = pool.acquire() if pool else sqlite3.connect(database)
+            # Register like @transactional, so nested @transactional helpers
+            # see the open transaction and use SAVEPOINTs
+            depth = transactions._enter(conn) if transactional else None
+            try:
+                written = ()
+                try:
+                    with deadline.interrupt_on_deadline(conn):
+                        if transactional:
+                            conn.execute("BEGIN")
+                            with cache.track_tables(conn, cache.WRITE_ACTIONS) as written:
+                                result = _call(conn, args, kwargs)
+                            conn.commit()
+                        else:
+                            result = _call(conn, args, kwargs)
+                except Exception as e:
+                    if transactional:
+                        conn.rollback()
+                        transactions.log_transaction(f"ROLLBACK: {name} failed with error: {e}")
+                        print(f"Transaction rolled back due to error: {e}")
+                    raise
+                if transactional:
+                    cache.invalidate_tables(written)
+                    transactions.log_transaction(f"COMMIT: {name} executed successfully")
+                return result
+            finally:
+                if depth is not None:
+                    transactions._exit(conn, depth)
+                if pool:
+                    pool.release(conn)
+                else:
+                    conn.close()
+
+        def _call(conn, args, kwargs):
+            """Run func, retrying transient errors like retry_on_failure."""
+            if log:
+                query = kwargs.get("query")
+                if query is None and len(args) > query_index:
+                    query = args[query_index]
+            if not retries:
+                if log:
+                    _log(query)
+                    start = time.perf_counter()
+                result = func(conn, *args, **kwargs)
+                if log and isinstance(query, str):
+                    stats.query_stats.record(
+                        query, time.perf_counter() - start, stats.row_count(result))
+                return result
+            active_breaker = breaker or retries_module.default_breaker
+            active_budget = budget or retries_module.default_budget
+            active_budget.record_call()
+            attempt = 0
+            while attempt < retries:
+                deadline.check()
+                if not active_breaker.allow():
+                    msg = f"Circuit open: skipping {name}."
+                    retries_module.log_message(msg)
+                    raise retries_module.CircuitOpenError(msg)
+                try:
+                    if log:
+                        _log(query)
+                        start = time.perf_counter()
+                    result = func(conn, *args, **kwargs)
+                    if log and isinstance(query, str):
+                        stats.query_stats.record(
+                            query, time.perf_counter() - start, stats.row_count(result))
+                except sqlite3.OperationalError as e:
+                    attempt += 1
+                    pause = retries_module.retry_delay(
+                        e, attempt, retries, active_breaker, active_budget,
+                        (delay, backoff, max_delay, jitter))
+                    if pause is None:
+                        raise
+                    time.sleep(pause)
+                except Exception as e:
+                    active_breaker.record_success()
+                    msg = f"Fatal error: {e}. Aborting retries."
+                    print(msg)
+                    retries_module.log_message(msg)
+                    raise
+                except BaseException:
+                    active_breaker.release()
+                    raise
+                else:
+                    active_breaker.record_success()
+                    return result
+            msg = f"Operation failed after {retries} retries."
+            print(msg)
+            retries_module.log_message(msg)
+            raise Exception(msg)
+
+        def _log(query):
+            """Log the query like log_queries does, once per attempt."""
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if query:
+                query_logging.query_log.write(f"[{timestamp}] Executing SQL Query: {query}", sampled=True)
+            else:
+                query_logging.query_log.write(f"[{timestamp}] No SQL query found to execute.", sampled=True)
+
+        return wrapper
+    return decorator
+
+
+@db_operation(retries=3, delay=1)
+def fetch_users(conn, query):
+    """Fetch users through the fused connection/transaction/retry/log wrapper"""
+    cursor = conn.cursor()
+    cursor.execute(query)
+    return cursor.fetchall()
+
+
+def benchmark(calls=5000, rounds=5):
+    """
+    Compare per-call overhead of the decorator stack and db_operation.
+    Both run the same no-op body against a scratch users.db with output
+    discarded, so the difference is the cost of the wrappers themselves.
+    Rounds alternate between the two and the best round is reported, since
+    connection setup and log appends make single runs noisy.
+    Run it with: python 5-db_operation.py --benchmark
+    """
+    def body(conn, query):
+        return None
+
+    stacked = with_db_connection(
+        transactions.transactional(
+            retries_module.retry_on_failure(retries=3, delay=0)(log_queries(body))))
+    fused = db_operation(retries=3, delay=0)(body)
+
+    # Run inside a scratch directory so users.db and transactions.log
+    # are throwaway files; the log sinks are closed before leaving it.
+    with tempfile.TemporaryDirectory() as scratch:
+        cwd = os.getcwd()
+        for sink in log_sink._sinks.values():
+            sink.close()
+        os.chdir(scratch)
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                timings = {"stacked": float("inf"), "fused": float("inf")}
+                for _ in range(rounds):
+                    for label, fn in (("stacked", stacked), ("fused", fused)):
+                        start = time.perf_counter()
+                        for _ in range(calls):
+                            fn(query="SELECT 1")
+                        elapsed = (time.perf_counter() - start) / calls * 1e6
+                        timings[label] = min(timings[label], elapsed)
+                for sink in log_sink._sinks.values():
+                    sink.close()
+        finally:
+            os.chdir(cwd)
+
+    for label, micros in timings.items():
+        print(f"{label:>8}: {micros:.2f} µs/call")
+    print(f"db_operation saves {timings['stacked'] - timings['fused']:.2f} µs/call")
+    return timings
+
+
+if __name__ == "__main__":
+    users = fetch_users(query="SELECT * FROM users")
+    print(users)
+    if "--benchmark" in sys.argv:
+        benchmark()
@@ -0,0 +1,166 @@
+import time
+import queue
+import sqlite3
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+transactions = __import__('2-transactional')
+cache = __import__('4-cache_query')
+deadline = __import__('deadline')
+
+
+class GroupCommitter:
+    """
+    Queues small writes from concurrent callers and commits them together.
+    A single writer thread owns the connection; it waits up to max_wait_ms
+    after the first queued write (or until max_ops are queued) and runs the
+    whole batch in one transaction, so SQLite pays one fsync per batch.
+    Each write runs in its own SAVEPOINT, so one failing write is rolled
+    back on its own and only its caller sees the exception.
+    """
+
+    def __init__(self, database="users.db", max_ops=100, max_wait_ms=5):
+        self.database = database
+        self.max_ops = max_ops
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, args, kwargs):
+        """Queue func(conn, *args, **kwargs) and return a Future for its result."""
+        future = Future()
+        # Under the lock, so a writer that fails to start cannot miss it
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+            self._queue.put((func, args, kwargs, future))
+        return future
+
+    def _run(self):
+        try:
+            conn = sqlite3.connect(self.database, isolation_level=None)
+        except Exception as e:
+            # Fail everything queued; the next submit() starts a new writer
+            # and tries to connect again
+            with self._lock:
+                self._thread = None
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        item[3].set_exception(e)
+            return
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                flush_at = time.monotonic() + self.max_wait
+                while len(batch) < self.max_ops:
+                    remaining = flush_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self._queue.put(None)  # stop after this batch
+                        break
+                    batch.append(item)
+                self._flush(conn, batch)
+        finally:
+            conn.close()
+
+    def _flush(self, conn, batch):
+        """Run one batch in a single transaction and resolve its futures."""
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            with cache.track_tables(conn, cache.WRITE_ACTIONS) as written:
+                for func, args, kwargs, future in batch:
+                    conn.execute("SAVEPOINT op")
+                    try:
+                        result = func(conn, *args, **kwargs)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO op")
+                        conn.execute("RELEASE op")
+                        outcomes.append((future, None, e))
+                    else:
+                        conn.execute("RELEASE op")
+                        outcomes.append((future, result, None))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            transactions.log_transaction(f"ROLLBACK: group of {len(batch)} writes failed with error: {e}")
+            for _, _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        cache.invalidate_tables(written)
+        ok = sum(1 for _, _, error in outcomes if error is None)
+        transactions.log_transaction(f"COMMIT: group of {len(batch)} writes ({ok} succeeded)")
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def close(self):
+        """Flush pending writes and stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+
+def group_commit(database="users.db", max_ops=100, max_wait_ms=5):
+    """
+    Decorator that batches calls into shared transactions (group commit).
+    The wrapped function takes the connection as its first argument, like
+    with with_db_connection, and must not commit itself. Callers block until
+    their batch commits and get back their own result or exception.
+    """
+    committer = GroupCommitter(database, max_ops, max_wait_ms)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            deadline.check()
+            future = committer.submit(func, args, kwargs)
+            try:
+                return future.result(timeout=deadline.remaining())
+            except FutureTimeout:
+                # The write stays queued and may still commit
+                raise deadline.DeadlineExceeded("deadline exceeded waiting for group commit") from None
+        wrapper.committer = committer
+        return wrapper
+    return decorator
+
+
+@group_commit(max_ops=50, max_wait_ms=5)
+def update_user_email(conn, user_id, new_email):
+    """Update a user's email address as part of a group commit"""
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+
+if __name__ == "__main__":
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        futures = [
+            pool.submit(update_user_email, user_id=i % 10 + 1, new_email=f"user{i}@example.com")
+            for i in range(200)
+        ]
+        for future in futures:
+            future.result()
+    update_user_email.committer.close()
+    print("200 email updates committed in groups; see transactions.log.")
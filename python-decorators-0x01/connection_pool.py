@@ -0,0 +1,261 @@
+import os
+import queue
+import asyncio
+import sqlite3
+import weakref
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+try:
+    import aiosqlite
+except ImportError:  # only needed for the async pool
+    aiosqlite = None
+
+DB_NAME = "users.db"
+
+# Named PRAGMA sets applied once to every pooled connection.
+# WAL lets readers run alongside a writer; synchronous=NORMAL is safe in WAL
+# mode and skips an fsync per commit. Negative cache_size is in KiB.
+# bulk_load trades durability for speed (no fsync, in-memory journal):
+# use it only for loads that can be redone after a crash.
+PROFILES = {
+    "default": {},
+    "read_heavy": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+    # read_heavy plus query_only, for pools that must never write
+    "read_only": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "query_only": "ON",
+    },
+    "write_heavy": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 4000,
+    },
+    "bulk_load": {
+        "journal_mode": "MEMORY",
+        "synchronous": "OFF",
+        "cache_size": -256000,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def profile_pragmas(profile):
+    """Return the PRAGMA statements for a named profile (none for None)."""
+    try:
+        pragmas = PROFILES[profile or "default"]
+    except KeyError:
+        raise ValueError(f"Unknown connection profile: {profile!r}") from None
+    return [f"PRAGMA {name}={value}" for name, value in pragmas.items()]
+
+
+def connect(database=DB_NAME, profile=None, **kwargs):
+    """Open a sqlite3 connection and apply the profile's PRAGMAs to it."""
+    conn = sqlite3.connect(database, **kwargs)
+    try:
+        for pragma in profile_pragmas(profile):
+            conn.execute(pragma)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of sqlite3 connections configured with a profile.
+    Connections are opened lazily up to `size`, get the profile's PRAGMAs
+    once when opened, and are reused afterwards. acquire() blocks when all
+    of them are in use.
+    """
+
+    def __init__(self, database=DB_NAME, profile=None, size=5, timeout=30):
+        self.database = database
+        self.profile = profile
+        self.size = size
+        self.timeout = timeout
+        profile_pragmas(profile)  # reject unknown profiles up front
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        """Borrow a connection, opening a new one while under `size`."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError(
+                "timed out waiting for a pooled connection")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return connect(self.database, self.profile,
+                           check_same_thread=False)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        """Return a connection, rolling back anything left uncommitted."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_pid = os.getpid()
+_pools_lock = threading.Lock()
+
+
+def get_pool(database=DB_NAME, profile=None, size=5):
+    """Return the process-wide pool for (database, profile), creating it once."""
+    global _pools_pid
+    key = (database, profile or "default")
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Connections must not be shared with a forked child
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(database, profile, size)
+        return pool
+
+
+class AsyncConnectionPool:
+    """
+    Fixed-size pool of aiosqlite connections for one event loop.
+    Each aiosqlite connection runs its own worker thread, so the pool keeps
+    at most `size` of them open; a semaphore makes every other caller wait
+    for a free connection instead of opening one more, and every release
+    (including dropping a broken connection) frees a slot again.
+        async with pool.connection() as conn:
+            await conn.execute(...)
+    """
+
+    def __init__(self, database=DB_NAME, profile=None, size=5):
+        self.database = database
+        self.profile = profile
+        self.size = size
+        self.pragmas = profile_pragmas(profile)
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def acquire(self):
+        """Borrow a connection, opening a new one while under `size`."""
+        await self._slots.acquire()
+        if self._idle:
+            return self._idle.pop()
+        try:
+            conn = await aiosqlite.connect(self.database)
+            try:
+                for pragma in self.pragmas:
+                    await conn.execute(pragma)
+            except BaseException:
+                await conn.close()
+                raise
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, conn):
+        """Return a connection, rolling back anything left uncommitted."""
+        try:
+            if conn.in_transaction:
+                await conn.rollback()
+        except Exception:
+            await conn.close()
+        else:
+            self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a connection for the duration of an async with block."""
+        conn = await self.acquire()
+        try:
+            yield conn
+        finally:
+            await self.release(conn)
+
+    async def close(self):
+        """Close every idle connection."""
+        while self._idle:
+            await self._idle.pop().close()
+
+
+# One set of pools per event loop, since asyncio primitives belong to a loop
+_async_pools = weakref.WeakKeyDictionary()
+
+
+async def _close_on_shutdown(pools):
+    """
+    Suspended async generator that closes a loop's pools when the loop
+    shuts down: asyncio.run() calls aclose() on pending async generators
+    before it closes the loop. Without this the aiosqlite worker threads
+    would keep the interpreter from exiting.
+    """
+    try:
+        yield
+    finally:
+        await close_async_pools(pools)
+
+
+async def get_async_pool(database=DB_NAME, profile=None, size=5):
+    """Return the running loop's pool for (database, profile), creating it once."""
+    loop = asyncio.get_running_loop()
+    pools = _async_pools.get(loop)
+    if pools is None:
+        pools = _async_pools[loop] = {}
+        closer = _close_on_shutdown(pools)
+        await closer.asend(None)
+        pools[None] = closer  # keep it referenced until the loop ends
+    key = (database, profile or "default")
+    if key not in pools:
+        pools[key] = AsyncConnectionPool(database, profile, size)
+    return pools[key]
+
+
+async def close_async_pools(pools=None):
+    """Close the running loop's pools (done automatically at shutdown)."""
+    if pools is None:
+        pools = _async_pools.get(asyncio.get_running_loop(), {})
+    for key, pool in list(pools.items()):
+        if key is not None:
+            await pool.close()
@@ -0,0 +1,107 @@
+import time
+import sqlite3
+import contextvars
+from contextlib import contextmanager, asynccontextmanager
+
+# Absolute time.monotonic() by which the current request must finish.
+# A ContextVar follows threads started with copy_context() and every
+# asyncio task, so each request carries its own deadline.
+_deadline = contextvars.ContextVar("db_deadline", default=None)
+
+# SQLite VM instructions between deadline checks while a query runs
+PROGRESS_STEPS = 1000
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the request's deadline has passed."""
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Give the DB calls made inside the block `seconds` to finish.
+    Nested blocks can only shorten the deadline, never extend it.
+        with deadline(0.5):
+            fetch_users_with_retry()
+    """
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires = min(expires, current)
+    token = _deadline.set(expires)
+    try:
+        yield expires
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the deadline, or None when no deadline is set."""
+    expires = _deadline.get()
+    if expires is None:
+        return None
+    return expires - time.monotonic()
+
+
+def check():
+    """Raise DeadlineExceeded if the deadline has already passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("deadline exceeded before the database call")
+
+
+def _progress_handler(expires):
+    # Runs inside SQLite (possibly on another thread), so it compares
+    # against the captured deadline rather than reading the ContextVar.
+    def handler():
+        return 1 if time.monotonic() >= expires else 0
+    return handler
+
+
+def _interrupted(error, expires):
+    return (isinstance(error, sqlite3.OperationalError)
+            and "interrupted" in str(error) and time.monotonic() >= expires)
+
+
+@contextmanager
+def interrupt_on_deadline(conn):
+    """
+    Abort statements running on `conn` once the deadline passes, raising
+    DeadlineExceeded instead of SQLite's "interrupted" OperationalError.
+    Does nothing when no deadline is set.
+    """
+    expires = _deadline.get()
+    if expires is None:
+        yield conn
+        return
+
+    check()
+    conn.set_progress_handler(_progress_handler(expires), PROGRESS_STEPS)
+    try:
+        yield conn
+    except sqlite3.OperationalError as e:
+        if _interrupted(e, expires):
+            raise DeadlineExceeded("deadline exceeded while the query was running") from e
+        raise
+    finally:
+        conn.set_progress_handler(None, PROGRESS_STEPS)
+
+
+@asynccontextmanager
+async def interrupt_on_deadline_async(conn):
+    """interrupt_on_deadline() for aiosqlite connections."""
+    expires = _deadline.get()
+    if expires is None:
+        yield conn
+        return
+
+    check()
+    await conn.set_progress_handler(_progress_handler(expires), PROGRESS_STEPS)
+    try:
+        yield conn
+    except sqlite3.OperationalError as e:
+        if _interrupted(e, expires):
+            raise DeadlineExceeded("deadline exceeded while the query was running") from e
+        raise
+    finally:
+        await conn.set_progress_handler(None, PROGRESS_STEPS)
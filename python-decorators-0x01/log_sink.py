@@ -0,0 +1,140 @@
+import os
+import sys
+import queue
+import atexit
+import random
+import threading
+
+
+class LogSink:
+    """
+    Non-blocking log writer shared by the DB decorators.
+    write() only puts the line on a queue; a background thread drains it
+    and writes whole batches to one file handle that stays open, so logging
+    adds no file open/write/close to the caller's DB operation.
+    With path=None lines go to stdout instead of a file.
+
+    max_bytes/backup_count rotate the file (transactions.log ->
+    transactions.log.1 ...) once it would grow past max_bytes.
+    sample_rate keeps only that fraction of lines written with sampled=True,
+    for high-volume logs such as per-query logging.
+    """
+
+    def __init__(self, path=None, max_bytes=10 * 1024 * 1024, backup_count=3,
+                 sample_rate=1.0, batch_size=256):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def write(self, line, sampled=False):
+        """Queue one line (without trailing newline) for writing."""
+        if sampled and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.dropped += 1
+            return
+        if self._pid != os.getpid():
+            self._start()
+        self._queue.put(line)
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # After a fork the parent's thread and queue are not ours to use
+            self._queue = queue.Queue()
+            self._file = None
+            self._thread = threading.Thread(
+                target=self._run, name=f"log-sink:{self.path or 'stdout'}", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"log sink {self.path or 'stdout'} failed: {e}", file=sys.stderr)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch):
+        if self.path is None:
+            sys.stdout.write("".join(f"{line}\n" for line in batch))
+            sys.stdout.flush()
+            return
+        if self._file is None:
+            self._file = open(self.path, "a")
+        size = self._file.tell()
+        pending = []
+        for line in batch:
+            entry = f"{line}\n"
+            length = len(entry.encode())
+            # Rotate before the line that would take the file past max_bytes;
+            # only a single line longer than max_bytes gets a file of its own
+            if self.max_bytes and size and size + length > self.max_bytes:
+                self._file.write("".join(pending))
+                pending = []
+                self._rotate()
+                size = 0
+            pending.append(entry)
+            size += length
+        self._file.write("".join(pending))
+        self._file.flush()
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a")
+
+    def flush(self):
+        """Block until every queued line has been written."""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        """Flush and close the file; it is reopened on the next write."""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+def get_sink(path=None, **options):
+    """Return the shared sink for a log file (None for stdout), creating it once."""
+    with _sinks_lock:
+        sink = _sinks.get(path)
+        if sink is None:
+            sink = _sinks[path] = LogSink(path, **options)
+        return sink
+
+
+@atexit.register
+def flush_all():
+    """Flush every sink; registered to run at interpreter exit."""
+    for sink in list(_sinks.values()):
+        sink.flush()
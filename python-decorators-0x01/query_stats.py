@@ -0,0 +1,117 @@
+import re
+import json
+import functools
+import threading
+from collections import deque
+from datetime import datetime
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(query):
+    """
+    Normalize a SQL string so queries differing only in literals match:
+    string and numeric literals become ?, IN lists collapse to IN (...),
+    and whitespace is collapsed.
+        "SELECT * FROM users WHERE age > 25" -> "SELECT * FROM users WHERE age > ?"
+    """
+    query = _STRING.sub("?", query)
+    query = _NUMBER.sub("?", query)
+    query = _IN_LIST.sub("IN (...)", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class QueryStats:
+    """
+    In-memory per-fingerprint aggregates, in the spirit of pg_stat_statements:
+    calls, total/mean/p95 latency and rows returned. p95 is computed from
+    the most recent `samples` latencies of each fingerprint.
+    """
+
+    def __init__(self, samples=1000):
+        self.samples = samples
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._snapshot_stop = None
+
+    def record(self, query, elapsed, rows=0):
+        """Add one execution of `query` that took `elapsed` seconds."""
+        key = fingerprint(query)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = {
+                    "calls": 0,
+                    "total_time": 0.0,
+                    "rows": 0,
+                    "latencies": deque(maxlen=self.samples),
+                }
+            entry["calls"] += 1
+            entry["total_time"] += elapsed
+            entry["rows"] += rows
+            entry["latencies"].append(elapsed)
+
+    def dump(self):
+        """Return aggregates per fingerprint, most total time first (times in ms)."""
+        with self._lock:
+            items = [(key, dict(entry, latencies=sorted(entry["latencies"])))
+                     for key, entry in self._stats.items()]
+        report = []
+        for key, entry in items:
+            latencies = entry["latencies"]
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            report.append({
+                "query": key,
+                "calls": entry["calls"],
+                "total_ms": round(entry["total_time"] * 1000, 3),
+                "mean_ms": round(entry["total_time"] / entry["calls"] * 1000, 3),
+                "p95_ms": round(p95 * 1000, 3),
+                "rows": entry["rows"],
+            })
+        report.sort(key=lambda row: row["total_ms"], reverse=True)
+        return report
+
+    def reset(self):
+        """Discard all aggregates."""
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self, path):
+        """Write the current aggregates to `path` as JSON."""
+        with open(path, "w") as snapshot_file:
+            json.dump({"taken_at": datetime.now().isoformat(), "queries": self.dump()},
+                      snapshot_file, indent=2)
+
+    def start_snapshots(self, path="query_stats.json", interval=60):
+        """Snapshot to `path` every `interval` seconds on a daemon thread."""
+        self.stop_snapshots()
+        stop = self._snapshot_stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.snapshot(path)
+
+        threading.Thread(target=run, name="query-stats-snapshot", daemon=True).start()
+
+    def stop_snapshots(self):
+        """Stop periodic snapshots started with start_snapshots()."""
+        if self._snapshot_stop is not None:
+            self._snapshot_stop.set()
+            self._snapshot_stop = None
+
+
+def row_count(result):
+    """
+    Rows returned by a query function: the length of a fetchall() list,
+    or 1 for a single fetchone() row (a tuple or sqlite3.Row).
+    """
+    if isinstance(result, list):
+        return len(result)
+    return 0 if result is None else 1
+
+
+query_stats = QueryStats()